@@ -0,0 +1,177 @@
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class Rejected(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("admission rejected")
+        self.retry_after = retry_after
+
+
+class AdmissionLimit:
+    """Concurrency limit with a bounded FIFO queue in front of it.
+
+    Up to ``max_concurrent`` holders run at once and up to ``max_queue`` more
+    wait in arrival order for at most ``queue_timeout`` seconds. Anything
+    beyond that, or anything arriving while ``saturated()`` is true, is
+    rejected immediately with a Retry-After estimated from recent service
+    times.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        saturated: Callable[[], bool] | None = None,
+    ) -> None:
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.saturated = saturated
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_seconds = 1.0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        backlog = self.waiting + 1
+        return max(1, math.ceil(self._service_seconds * backlog / self.max_concurrent))
+
+    async def acquire(self) -> None:
+        if self.saturated is not None and self.saturated():
+            self.rejected += 1
+            raise Rejected(self.retry_after())
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Rejected(self.retry_after())
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Handed a slot just as the wait expired: keep it.
+                self.admitted += 1
+                return
+            future.cancel()
+            self._waiters.remove(future)
+            self.timed_out += 1
+            raise Rejected(self.retry_after())
+        except BaseException:
+            if future.done() and not future.cancelled():
+                self.release(0.0)
+            else:
+                future.cancel()
+                self._waiters.remove(future)
+            raise
+        self.admitted += 1
+
+    def release(self, seconds: float) -> None:
+        if seconds:
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * seconds
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                # The slot passes straight to the next waiter.
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "maxConcurrent": self.max_concurrent,
+            "maxQueue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timedOut": self.timed_out,
+            "avgServiceSeconds": round(self._service_seconds, 3),
+        }
+
+
+class AdmissionMiddleware:
+    """Apply an AdmissionLimit to matching routes before the request body is read.
+
+    ``routes`` maps ``(method, path)`` pairs to limits; rejected requests get
+    a 429 with ``Retry-After`` without the upload ever reaching disk. Bodies
+    declaring a Content-Length above ``max_body`` are refused with a 413.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        routes: Iterable[Tuple[str, str, AdmissionLimit]],
+        max_body: int | None = None,
+    ) -> None:
+        self.app = app
+        self.routes = {(method, path): limit for method, path, limit in routes}
+        self.max_body = max_body
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = None
+        if scope["type"] == "http":
+            limit = self.routes.get((scope["method"], scope["path"].rstrip("/") or "/"))
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        if self.max_body is not None:
+            length = dict(scope["headers"]).get(b"content-length", b"")
+            if length.isdigit() and int(length) > self.max_body:
+                await self._respond(send, 413, "Upload exceeds the size limit")
+                return
+        try:
+            await limit.acquire()
+        except Rejected as exc:
+            await self._respond(
+                send,
+                429,
+                f"Too many concurrent {limit.name} requests",
+                [(b"retry-after", str(exc.retry_after).encode())],
+            )
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release(time.perf_counter() - started)
+
+    async def _respond(
+        self,
+        send: Send,
+        status: int,
+        detail: str,
+        headers: List[Tuple[bytes, bytes]] | None = None,
+    ) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    *(headers or []),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,95 @@
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Tuple
+
+from .metrics import LATENCY_BUCKETS, SIZE_BUCKETS, Histogram
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into one batched call.
+
+    Items wait at most ``max_wait`` seconds, or until ``max_batch_size`` items
+    are pending, before ``fn`` runs on the whole batch in ``executor``. ``fn``
+    must return one result per item, in order.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int,
+        max_wait: float,
+        executor: Executor | None = None,
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self.executor = executor
+        self.batch_size = Histogram(
+            f"{name}_batch_size", f"Items per {name} batch", SIZE_BUCKETS
+        )
+        self.queue_wait = Histogram(
+            f"{name}_queue_wait_seconds", f"Time items wait for a {name} batch", LATENCY_BUCKETS
+        )
+        self.run_time = Histogram(
+            f"{name}_batch_seconds", f"Time to run one {name} batch", LATENCY_BUCKETS
+        )
+        self._pending: List[Tuple[Any, asyncio.Future, float]] = []
+        self._timer: asyncio.TimerHandle | None = None
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future, float]]) -> None:
+        started = time.perf_counter()
+        self.batch_size.observe(len(batch))
+        for _, _, enqueued in batch:
+            self.queue_wait.observe(started - enqueued)
+        items = [item for item, _, _ in batch]
+        loop = asyncio.get_running_loop()
+        try:
+            with self.run_time.time():
+                results = await loop.run_in_executor(self.executor, self.fn, items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name} batch returned {len(results)} results for {len(items)} items"
+                )
+        except Exception as exc:  # noqa: BLE001
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "maxBatchSize": self.max_batch_size,
+            "maxWaitMs": round(self.max_wait * 1000, 3),
+            "pending": len(self._pending),
+            "batchSize": self.batch_size.snapshot(),
+            "queueWaitSeconds": self.queue_wait.snapshot(),
+            "batchSeconds": self.run_time.snapshot(),
+        }
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Sequence, Tuple
+
+from elasticsearch import AsyncElasticsearch
+
+log = logging.getLogger("audio_service.bulk")
+
+Action = Tuple[int, str | None, Dict[str, Any]]
+
+
+class LineTooLong(Exception):
+    def __init__(self, line: int, max_bytes: int) -> None:
+        super().__init__(f"Line {line} exceeds {max_bytes} bytes")
+        self.line = line
+        self.report: Dict[str, Any] | None = None
+
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: int
+) -> AsyncIterator[Tuple[int, bytes]]:
+    pending = b""
+    line_no = 0
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if len(line) > max_line_bytes:
+                raise LineTooLong(line_no, max_line_bytes)
+            if line.strip():
+                yield line_no, line
+        # Without a newline the partial line would otherwise grow unbounded.
+        if len(pending) > max_line_bytes:
+            raise LineTooLong(line_no + 1, max_line_bytes)
+    if pending.strip():
+        yield line_no + 1, pending
+
+
+class BulkReport:
+    def __init__(self, max_errors: int) -> None:
+        self.max_errors = max_errors
+        self.indexed = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def fail(self, line: int, doc_id: str | None, reason: Any) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "id": doc_id, "error": reason})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "success": self.failed == 0,
+            "indexed": self.indexed,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errorsTruncated": self.failed > len(self.errors),
+        }
+
+
+async def _send_chunk(
+    client: AsyncElasticsearch,
+    index: str,
+    actions: Sequence[Action],
+    report: BulkReport,
+    max_retries: int,
+) -> None:
+    attempt = 0
+    while actions:
+        operations: List[Dict[str, Any]] = []
+        for _, doc_id, doc in actions:
+            meta = {"_index": index}
+            if doc_id is not None:
+                meta["_id"] = doc_id
+            operations.append({"index": meta})
+            operations.append(doc)
+        try:
+            resp = await client.bulk(operations=operations)
+        except Exception as exc:  # noqa: BLE001
+            for line, doc_id, _ in actions:
+                report.fail(line, doc_id, str(exc))
+            return
+        retry: List[Action] = []
+        for action, item in zip(actions, resp.get("items", [])):
+            result = item.get("index", {})
+            line, doc_id, _ = action
+            if result.get("status", 500) < 300:
+                report.indexed += 1
+            elif result.get("status") == 429 and attempt < max_retries:
+                retry.append(action)
+            else:
+                report.fail(line, result.get("_id", doc_id), result.get("error"))
+        actions = retry
+        attempt += 1
+        if actions:
+            await asyncio.sleep(min(2**attempt * 0.1, 5))
+
+
+async def bulk_ingest(
+    client: AsyncElasticsearch,
+    index: str,
+    lines: AsyncIterator[Tuple[int, bytes]],
+    chunk_size: int,
+    workers: int,
+    max_retries: int,
+    max_errors: int,
+) -> Dict[str, Any]:
+    """Index NDJSON documents in chunks with up to ``workers`` bulk requests in flight.
+
+    Reading stops while every worker slot is busy, so memory stays bounded by
+    ``chunk_size * workers`` documents. An ``id`` field, when present, becomes
+    the document ``_id``. A ``LineTooLong`` from ``lines`` is raised once
+    the chunks already dispatched finish, carrying their report.
+    """
+    report = BulkReport(max_errors)
+    slots = asyncio.Semaphore(max(1, workers))
+    tasks: set[asyncio.Task] = set()
+
+    async def dispatch(actions: List[Action]) -> None:
+        await slots.acquire()
+
+        async def run() -> None:
+            try:
+                await _send_chunk(client, index, actions, report, max_retries)
+            finally:
+                slots.release()
+
+        task = asyncio.create_task(run())
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    chunk: List[Action] = []
+    try:
+        async for line_no, raw in lines:
+            try:
+                doc = json.loads(raw)
+            except ValueError as exc:
+                report.fail(line_no, None, f"Invalid JSON: {exc}")
+                continue
+            if not isinstance(doc, dict):
+                report.fail(line_no, None, "Each line must be a JSON object")
+                continue
+            doc_id = doc.pop("id", None)
+            chunk.append((line_no, str(doc_id) if doc_id is not None else None, doc))
+            if len(chunk) >= chunk_size:
+                await dispatch(chunk)
+                chunk = []
+    except LineTooLong as exc:
+        if tasks:
+            await asyncio.gather(*tasks)
+        exc.report = report.as_dict()
+        raise
+    if chunk:
+        await dispatch(chunk)
+    if tasks:
+        await asyncio.gather(*tasks)
+    return report.as_dict()
+
+
+async def export_ndjson(
+    client: AsyncElasticsearch,
+    index: str,
+    page_size: int,
+    keep_alive: str,
+    source_excludes: Sequence[str] = (),
+) -> AsyncIterator[bytes]:
+    """Stream every document as NDJSON using a point in time and search_after."""
+    pit = await client.open_point_in_time(index=index, keep_alive=keep_alive)
+    pit_id = pit["id"]
+    search_after = None
+    try:
+        while True:
+            params: Dict[str, Any] = {}
+            if search_after is not None:
+                params["search_after"] = search_after
+            if source_excludes:
+                params["source_excludes"] = list(source_excludes)
+            resp = await client.search(
+                pit={"id": pit_id, "keep_alive": keep_alive},
+                size=page_size,
+                sort=["_shard_doc"],
+                track_total_hits=False,
+                **params,
+            )
+            pit_id = resp.get("pit_id", pit_id)
+            hits = resp.get("hits", {}).get("hits", [])
+            if not hits:
+                break
+            yield b"".join(
+                json.dumps({"id": hit.get("_id"), **(hit.get("_source") or {})}).encode()
+                + b"\n"
+                for hit in hits
+            )
+            search_after = hits[-1]["sort"]
+    finally:
+        try:
+            await client.close_point_in_time(id=pit_id)
+        except Exception as exc:  # noqa: BLE001
+            log.warning("Failed to close point in time: %s", exc)
@@ -0,0 +1,26 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict
+
+START = "*"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    raw = json.dumps(state, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        state = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError) as exc:
+        raise InvalidCursor("Malformed cursor") from exc
+    if not isinstance(state, dict) or "pit" not in state or "after" not in state:
+        raise InvalidCursor("Malformed cursor")
+    return state
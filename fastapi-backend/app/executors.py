@@ -0,0 +1,56 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+
+
+class TrackedThreadPoolExecutor(ThreadPoolExecutor):
+    """Thread pool that counts queued and running work items."""
+
+    def __init__(self, name: str, max_workers: int | None = None) -> None:
+        super().__init__(max_workers=max_workers, thread_name_prefix=name)
+        self.name = name
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self._counts_lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        with self._counts_lock:
+            self.queued += 1
+        try:
+            return super().submit(self._track, fn, *args, **kwargs)
+        except BaseException:
+            with self._counts_lock:
+                self.queued -= 1
+            raise
+
+    def _track(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._counts_lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._counts_lock:
+                self.active -= 1
+                self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "maxWorkers": self._max_workers,
+            "queued": self.queued,
+            "active": self.active,
+            "completed": self.completed,
+        }
+
+
+async def run_in(executor: Executor | None, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Like ``asyncio.to_thread`` but on ``executor``; thread pools keep the caller's context."""
+    loop = asyncio.get_running_loop()
+    if executor is None or isinstance(executor, ThreadPoolExecutor):
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(executor, partial(context.run, fn, *args, **kwargs))
+    return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
@@ -0,0 +1,288 @@
+import asyncio
+import mimetypes
+import os
+import re
+import secrets
+import stat
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import List, Mapping, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from .memo import LRUCache
+
+CONTENT_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+MAX_RANGES = 16
+READ_CHUNK = 1024 * 1024
+ZEROCOPY = "http.response.zerocopysend"
+
+Range = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class FileInfo:
+    path: Path
+    size: int
+    mtime: float
+    media_type: str
+    etag: str
+    last_modified: str
+    immutable: bool
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+file_info_cache = LRUCache(4096, ttl=2.0)
+
+
+def _stat_file(path: Path) -> FileInfo | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    immutable = bool(CONTENT_DIGEST.match(path.name))
+    etag = f'"{path.name}"' if immutable else f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+    return FileInfo(
+        path=path,
+        size=st.st_size,
+        mtime=st.st_mtime,
+        media_type=mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+        etag=etag,
+        last_modified=formatdate(st.st_mtime, usegmt=True),
+        immutable=immutable,
+    )
+
+
+async def get_file_info(path: Path, media_type: str | None = None) -> FileInfo | None:
+    key = (str(path), media_type)
+    info = file_info_cache.get(key)
+    if info is None:
+        info = await asyncio.to_thread(_stat_file, path)
+        if info is None:
+            return None
+        if media_type:
+            info = FileInfo(**{**info.__dict__, "media_type": media_type})
+        file_info_cache.set(key, info)
+    return info
+
+
+def parse_ranges(header: str, size: int) -> List[Range] | None:
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+    ranges: List[Range] = []
+    for part in spec.split(","):
+        start_str, sep, end_str = part.strip().partition("-")
+        start_str, end_str = start_str.strip(), end_str.strip()
+        if not sep or not (start_str.isdigit() or start_str == "") or not (
+            end_str.isdigit() or end_str == ""
+        ):
+            return None
+        if not start_str:
+            if not end_str:
+                return None
+            length = int(end_str)
+            if length == 0:
+                continue
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(start_str)
+            end = min(int(end_str), size - 1) if end_str else size - 1
+            if end_str and int(end_str) < start:
+                return None
+            if start >= size:
+                continue
+        ranges.append((start, end))
+    if not ranges:
+        raise RangeNotSatisfiable()
+    if len(ranges) > MAX_RANGES:
+        return None
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _etag_matches(header: str, etag: str, weak: bool) -> bool:
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _not_modified_since(header: str, info: FileInfo) -> bool:
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(info.mtime) <= since
+
+
+def _if_range_matches(header: str, info: FileInfo) -> bool:
+    header = header.strip()
+    if header.startswith('"') or header.startswith("W/"):
+        return _etag_matches(header, info.etag, weak=False)
+    return header == info.last_modified
+
+
+def serve_file(
+    request: Request, info: FileInfo, extra_headers: Mapping[str, str] | None = None
+) -> Response:
+    """Build a response honouring validators and (multi-)range requests."""
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": info.etag,
+        "Last-Modified": info.last_modified,
+        "Cache-Control": "public, max-age=31536000, immutable"
+        if info.immutable
+        else "public, max-age=86400",
+        **(extra_headers or {}),
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, info.etag, weak=True):
+            return Response(status_code=304, headers=headers)
+    elif "if-modified-since" in request.headers:
+        if _not_modified_since(request.headers["if-modified-since"], info):
+            return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    ranges = None
+    if range_header and (if_range is None or _if_range_matches(if_range, info)):
+        try:
+            ranges = parse_ranges(range_header, info.size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=416, headers={**headers, "Content-Range": f"bytes */{info.size}"}
+            )
+    send_body = request.method != "HEAD"
+    if not ranges:
+        return FileRangeResponse(info, [(0, info.size - 1)], 200, headers, send_body)
+    return FileRangeResponse(info, ranges, 206, headers, send_body)
+
+
+class FileRangeResponse(Response):
+    """Send byte ranges of a file, via zero-copy sendfile when the server offers it.
+
+    Servers advertising the ASGI ``http.response.zerocopysend`` extension get
+    the file descriptor and hand it to ``sendfile(2)``. Otherwise the ranges
+    are read in 1 MiB ``pread`` calls off the event loop.
+    """
+
+    def __init__(
+        self,
+        info: FileInfo,
+        ranges: List[Range],
+        status_code: int,
+        headers: Mapping[str, str],
+        send_body: bool = True,
+    ) -> None:
+        self.info = info
+        self.send_body = send_body
+        self.status_code = status_code
+        self.background = None
+        self.parts: List[Tuple[bytes, int, int]] = []
+        response_headers = dict(headers)
+        if info.size == 0:
+            ranges = []
+        if status_code == 206 and len(ranges) > 1:
+            boundary = secrets.token_hex(12)
+            length = 0
+            for start, end in ranges:
+                head = (
+                    f"\r\n--{boundary}\r\nContent-Type: {info.media_type}\r\n"
+                    f"Content-Range: bytes {start}-{end}/{info.size}\r\n\r\n"
+                ).encode()
+                self.parts.append((head, start, end - start + 1))
+                length += len(head) + end - start + 1
+            tail = f"\r\n--{boundary}--\r\n".encode()
+            self.parts.append((tail, 0, 0))
+            length += len(tail)
+            response_headers["Content-Type"] = f"multipart/byteranges; boundary={boundary}"
+        else:
+            length = 0
+            for start, end in ranges:
+                self.parts.append((b"", start, end - start + 1))
+                length += end - start + 1
+            response_headers["Content-Type"] = info.media_type
+            if status_code == 206:
+                start, end = ranges[0]
+                response_headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+        response_headers["Content-Length"] = str(length)
+        self.init_headers(response_headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.send_body:
+            await self._start(send)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        # Open before any header goes out: a file removed since it was
+        # stat'ed can still be answered with a 404.
+        try:
+            fd = await asyncio.to_thread(os.open, self.info.path, os.O_RDONLY)
+        except FileNotFoundError:
+            path = str(self.info.path)
+            file_info_cache.pop((path, None))
+            file_info_cache.pop((path, self.info.media_type))
+            await Response(status_code=404)(scope, receive, send)
+            return
+        zerocopy = ZEROCOPY in scope.get("extensions", {})
+        try:
+            await self._start(send)
+            for head, offset, count in self.parts:
+                if head:
+                    await send({"type": "http.response.body", "body": head, "more_body": True})
+                if not count:
+                    continue
+                if zerocopy:
+                    await send(
+                        {
+                            "type": ZEROCOPY,
+                            "file": fd,
+                            "offset": offset,
+                            "count": count,
+                            "more_body": True,
+                        }
+                    )
+                    continue
+                end = offset + count
+                while offset < end:
+                    chunk = await asyncio.to_thread(
+                        os.pread, fd, min(READ_CHUNK, end - offset), offset
+                    )
+                    if not chunk:
+                        # Content-Length is already out; raising makes the
+                        # server drop the connection so the client sees a
+                        # truncated body instead of a short one ending cleanly.
+                        raise RuntimeError(f"{self.info.path} shrank while being sent")
+                    offset += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
+
+    async def _start(self, send: Send) -> None:
+        await send(
+            {"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers}
+        )
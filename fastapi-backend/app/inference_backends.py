@@ -0,0 +1,130 @@
+import logging
+import os
+import secrets
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict
+
+log = logging.getLogger("audio_service.inference_backends")
+
+SPEECH_TASK = "automatic-speech-recognition"
+TEXT_TASK = "text-classification"
+BACKENDS = ("pytorch", "quantized", "onnx")
+
+
+@dataclass(frozen=True)
+class BackendConfig:
+    name: str = "pytorch"
+    cache_dir: Path | None = None
+    intra_op_threads: int = 0
+    inter_op_threads: int = 0
+
+
+def artifact_dir(config: BackendConfig, model_name: str, version: str) -> Path:
+    # The library version is part of the key: pickled quantized modules and
+    # exported graphs are not portable across releases.
+    return config.cache_dir / f"{model_name.replace('/', '--')}-{config.name}-{version}"
+
+
+def _components(task: str, model_name: str) -> Dict[str, Any]:
+    from transformers import AutoFeatureExtractor, AutoTokenizer
+
+    parts: Dict[str, Any] = {"tokenizer": AutoTokenizer.from_pretrained(model_name)}
+    if task == SPEECH_TASK:
+        parts["feature_extractor"] = AutoFeatureExtractor.from_pretrained(model_name)
+    return parts
+
+
+def _set_torch_threads(config: BackendConfig) -> None:
+    import torch
+
+    if config.intra_op_threads > 0:
+        torch.set_num_threads(config.intra_op_threads)
+    if config.inter_op_threads > 0:
+        try:
+            torch.set_num_interop_threads(config.inter_op_threads)
+        except RuntimeError:
+            # Only settable before the first parallel region runs.
+            log.warning("Inter-op thread count already fixed for this process")
+
+
+def _build_pytorch(task: str, model_name: str, config: BackendConfig):
+    from transformers import pipeline
+
+    _set_torch_threads(config)
+    return pipeline(task, model_name)
+
+
+def _build_quantized(task: str, model_name: str, config: BackendConfig):
+    import torch
+    from transformers import pipeline
+
+    _set_torch_threads(config)
+    cached = artifact_dir(config, model_name, torch.__version__) / "model.pt"
+    if cached.is_file():
+        model = torch.load(cached, weights_only=False)
+        return pipeline(task, model=model, **_components(task, model_name))
+    built = pipeline(task, model_name)
+    built.model = torch.ao.quantization.quantize_dynamic(
+        built.model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_name(f".{cached.name}.{secrets.token_hex(4)}.tmp")
+    torch.save(built.model, tmp)
+    os.replace(tmp, cached)
+    log.info("Cached int8 %s at %s", model_name, cached)
+    return built
+
+
+def _session_options(config: BackendConfig):
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if config.intra_op_threads > 0:
+        options.intra_op_num_threads = config.intra_op_threads
+    if config.inter_op_threads > 0:
+        options.inter_op_num_threads = config.inter_op_threads
+    if config.inter_op_threads > 1:
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_PARALLEL
+    return options
+
+
+def _build_onnx(task: str, model_name: str, config: BackendConfig):
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTModelForSpeechSeq2Seq
+    from optimum.version import __version__ as optimum_version
+    from transformers import pipeline
+
+    model_class = (
+        ORTModelForSpeechSeq2Seq if task == SPEECH_TASK else ORTModelForSequenceClassification
+    )
+    options = {"session_options": _session_options(config), "provider": "CPUExecutionProvider"}
+    target = artifact_dir(config, model_name, optimum_version)
+    if (target / "config.json").is_file():
+        model = model_class.from_pretrained(target, **options)
+    else:
+        model = model_class.from_pretrained(model_name, export=True, **options)
+        staging = target.with_name(f".{target.name}.{secrets.token_hex(4)}.tmp")
+        model.save_pretrained(staging)
+        try:
+            os.replace(staging, target)
+            log.info("Cached ONNX export of %s at %s", model_name, target)
+        except OSError:
+            # Another worker process finished the same export first.
+            shutil.rmtree(staging, ignore_errors=True)
+    return pipeline(task, model=model, **_components(task, model_name))
+
+
+def build_pipeline(task: str, model_name: str, config: BackendConfig):
+    """Build a transformers pipeline for ``task`` on the configured backend.
+
+    ``quantized`` applies dynamic int8 quantization to every Linear layer;
+    ``onnx`` runs an exported ONNX Runtime graph. Both keep their artifact
+    under ``config.cache_dir`` so only the first start pays for it.
+    """
+    if config.name == "quantized":
+        return _build_quantized(task, model_name, config)
+    if config.name == "onnx":
+        return _build_onnx(task, model_name, config)
+    return _build_pytorch(task, model_name, config)
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+log = logging.getLogger("audio_service.jobs")
+
+PENDING_STATES = ("queued", "running")
+FINAL_STATES = ("done", "failed")
+
+JobHandler = Callable[[Dict[str, Any], Callable[[str], Awaitable[None]]], Awaitable[Dict[str, Any]]]
+
+
+class JobStore:
+    """One JSON file per job so queued work survives a restart."""
+
+    def __init__(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+
+    def _path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.json"
+
+    def write(self, job: Dict[str, Any]) -> None:
+        target = self._path(job["id"])
+        tmp = target.with_suffix(".tmp")
+        tmp.write_text(json.dumps(job), encoding="utf-8")
+        os.replace(tmp, target)
+
+    def read(self, job_id: str) -> Dict[str, Any] | None:
+        if not job_id.isalnum():
+            return None
+        try:
+            return json.loads(self._path(job_id).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except json.JSONDecodeError:
+            log.warning("Discarding unreadable job file %s", job_id)
+            return None
+
+    def pending(self) -> List[Dict[str, Any]]:
+        jobs = []
+        for path in self.directory.glob("*.json"):
+            job = self.read(path.stem)
+            if job and job.get("status") in PENDING_STATES:
+                jobs.append(job)
+        jobs.sort(key=lambda job: job.get("createdAt", 0))
+        return jobs
+
+    def prune(self, max_age: float) -> int:
+        cutoff = time.time() - max_age
+        removed = 0
+        for path in self.directory.glob("*.json"):
+            job = self.read(path.stem)
+            if job and job.get("status") in FINAL_STATES and job.get("updatedAt", 0) < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+class JobQueue:
+    def __init__(
+        self,
+        store: JobStore,
+        handler: JobHandler,
+        workers: int,
+        max_pending: int,
+        retention: float,
+    ) -> None:
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._listeners: Dict[str, List[asyncio.Queue]] = {}
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self) -> None:
+        pruned = await asyncio.to_thread(self.store.prune, self.retention)
+        recovered = await asyncio.to_thread(self.store.pending)
+        for job in recovered:
+            job["status"] = "queued"
+            job["stage"] = None
+            await self._save(job)
+            self._queue.put_nowait(job["id"])
+        if recovered or pruned:
+            log.info("Recovered %s pending jobs, pruned %s finished jobs", len(recovered), pruned)
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload: Dict[str, Any]) -> Dict[str, Any] | None:
+        if self._queue.qsize() >= self.max_pending:
+            return None
+        now = time.time()
+        job = {
+            "id": secrets.token_hex(12),
+            "status": "queued",
+            "stage": None,
+            "createdAt": now,
+            "updatedAt": now,
+            "input": payload,
+            "result": None,
+            "error": None,
+        }
+        await self._save(job)
+        self._queue.put_nowait(job["id"])
+        return job
+
+    async def get(self, job_id: str) -> Dict[str, Any] | None:
+        return await asyncio.to_thread(self.store.read, job_id)
+
+    async def events(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        listener: asyncio.Queue = asyncio.Queue()
+        self._listeners.setdefault(job_id, []).append(listener)
+        try:
+            job = await self.get(job_id)
+            if job is None:
+                return
+            yield job
+            while job["status"] not in FINAL_STATES:
+                job = await listener.get()
+                yield job
+        finally:
+            listeners = self._listeners.get(job_id, [])
+            if listener in listeners:
+                listeners.remove(listener)
+            if not listeners:
+                self._listeners.pop(job_id, None)
+
+    async def _save(self, job: Dict[str, Any]) -> None:
+        job["updatedAt"] = time.time()
+        await asyncio.to_thread(self.store.write, job)
+        for listener in self._listeners.get(job["id"], []):
+            listener.put_nowait(dict(job))
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                log.error("Job worker %s crashed on %s: %s", number, job_id, exc)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = await self.get(job_id)
+        if job is None or job.get("status") != "queued":
+            return
+        job["status"] = "running"
+        await self._save(job)
+
+        async def progress(stage: str) -> None:
+            job["stage"] = stage
+            await self._save(job)
+
+        try:
+            job["result"] = await self.handler(job["input"], progress)
+            job["status"] = "done"
+        except Exception as exc:  # noqa: BLE001
+            log.error("Job %s failed: %s", job_id, exc)
+            job["status"] = "failed"
+            job["error"] = str(exc)
+        job["stage"] = None
+        await self._save(job)
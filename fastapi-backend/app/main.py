@@ -1,30 +1,92 @@
 import asyncio
+import hashlib
 import json
 import logging
-import mimetypes
 import os
 import secrets
 import subprocess
+import time
 import wave
+from contextlib import aclosing
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
 
 import numpy as np
-from elasticsearch import Elasticsearch, NotFoundError
+from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import FastAPI, File, HTTPException, Query, Request, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from keybert import KeyBERT
-from transformers import pipeline
-
-logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+from starlette.routing import Match
+
+from . import model_workers as worker_tasks
+from .admission import AdmissionLimit, AdmissionMiddleware
+from .analysis_cache import AnalysisCache
+from .batching import MicroBatcher
+from .bulk import LineTooLong, bulk_ingest, export_ndjson, iter_ndjson_lines
+from .cursors import START, InvalidCursor, decode_cursor, encode_cursor
+from .executors import TrackedThreadPoolExecutor, run_in
+from .file_serving import get_file_info, serve_file
+from .inference_backends import (
+    BACKENDS,
+    SPEECH_TASK,
+    TEXT_TASK,
+    BackendConfig,
+    build_pipeline,
+)
+from .jobs import JobQueue, JobStore
+from .media_probe import probe_media, remember_probe
+from .memo import LRUCache, ResultCache
+from .metrics import (
+    LATENCY_BUCKETS,
+    RATIO_BUCKETS,
+    Counter,
+    Gauge,
+    Histogram,
+    HistogramFamily,
+    Registry,
+)
+from .model_workers import ModelWorkerPool
+from .peaks import (
+    MEDIA_TYPE as PEAKS_MEDIA_TYPE,
+    PeakBuilder,
+    level_path,
+    parse_levels,
+    pick_level,
+    read_length,
+    remove_peaks,
+    write_peaks,
+)
+from .reindex import Reindexer, versioned_name
+from .renditions import FORMATS, HLS_MEDIA_TYPES, RenditionStore
+from .tracing import RequestMetricsMiddleware, install_log_trace_ids
+from .uploads import CONTENT_DIGEST, UploadError, UploadStore, sha256_file
+from .vad import Timeline, VadConfig, pack_speech
+from .windowing import split_windows, stitch_texts
+
+TRACE_IDS_ENABLED = os.getenv("TRACE_IDS_ENABLED", "0") == "1"
+install_log_trace_ids()
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(levelname)s [%(trace_id)s] %(message)s"
+    if TRACE_IDS_ENABLED
+    else "%(levelname)s %(message)s",
+)
 log = logging.getLogger("audio_service")
+STARTED_AT = time.time()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-UPLOAD_DIR = BASE_DIR / "uploads"
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", str(BASE_DIR / "uploads")))
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(512 * 1024 * 1024)))
+UPLOAD_CHUNK_MAX_BYTES = int(os.getenv("UPLOAD_CHUNK_MAX_BYTES", str(64 * 1024 * 1024)))
+UPLOAD_SESSION_TTL = float(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+UPLOAD_REAPER_ENABLED = os.getenv("UPLOAD_REAPER_ENABLED", "1") == "1"
+UPLOAD_REAP_INTERVAL = float(os.getenv("UPLOAD_REAP_INTERVAL", "3600"))
+UPLOAD_ORPHAN_GRACE_SECONDS = float(os.getenv("UPLOAD_ORPHAN_GRACE_SECONDS", str(7 * 24 * 3600)))
+UPLOAD_REAP_BATCH = 1000
 
 ES_NODE = os.getenv("ES_NODE", "http://localhost:9200")
 ES_API_KEY = os.getenv(
@@ -32,6 +94,125 @@ ES_API_KEY = os.getenv(
     "ekozdERwc0JCWHN0ZEo0X0VtVTU6OUNLU3BYNVRHN3d5VkxUdEVHWWR6dw==",
 )
 ES_INDEX = "audio_analysis"
+ES_CONNECTIONS_PER_NODE = int(os.getenv("ES_CONNECTIONS_PER_NODE", "32"))
+ES_REQUEST_TIMEOUT = float(os.getenv("ES_REQUEST_TIMEOUT", "10"))
+ES_MAX_RETRIES = int(os.getenv("ES_MAX_RETRIES", "3"))
+ES_RETRY_ON_TIMEOUT = os.getenv("ES_RETRY_ON_TIMEOUT", "1") == "1"
+ES_HTTP_COMPRESS = os.getenv("ES_HTTP_COMPRESS", "0") == "1"
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", "4"))
+BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", "1000"))
+BULK_MAX_LINE_BYTES = int(os.getenv("BULK_MAX_LINE_BYTES", str(8 * 1024 * 1024)))
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+PIT_KEEP_ALIVE = os.getenv("PIT_KEEP_ALIVE", "2m")
+ES_REFRESH_INTERVAL = float(os.getenv("ES_REFRESH_INTERVAL", "1"))
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "5"))
+READ_CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", "512"))
+
+SPEECH_MODEL = "openai/whisper-tiny"
+EMOTION_MODEL = "songhieng/khmer-xlmr-base-sentimental-multi-label"
+KEYWORD_MODEL = "all-MiniLM-L6-v2"
+# Long-form chunking for a whole-file transcription call.
+SPEECH_CHUNKING: Dict[str, Any] = {"chunk_length_s": 30, "stride_length_s": (6, 2)}
+ANALYSIS_VERSION = "2"
+
+CACHE_DIR = Path(os.getenv("CACHE_DIR", str(BASE_DIR / "cache")))
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+JOBS_DIR = Path(os.getenv("JOBS_DIR", str(BASE_DIR / "jobs")))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "256"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+REINDEX_CONCURRENCY = int(os.getenv("REINDEX_CONCURRENCY", "2"))
+REINDEX_BATCH_SIZE = int(os.getenv("REINDEX_BATCH_SIZE", "50"))
+REINDEX_AUTO_RESUME = os.getenv("REINDEX_AUTO_RESUME", "1") == "1"
+REINDEX_FIELDS = (
+    "storedPath",
+    "transcription",
+    "transcriptionVector",
+    "confidence",
+    "keywords",
+    "emotions",
+    "primaryEmotions",
+    "scores",
+    "duration",
+    "bitRate",
+)
+SAMPLE_RATE = 16000
+AUDIO_DECODE_MODE = os.getenv("AUDIO_DECODE_MODE", "pipe")
+DECODE_CHUNK_SECONDS = float(os.getenv("DECODE_CHUNK_SECONDS", "30"))
+MAX_DECODE_SECONDS = float(os.getenv("MAX_DECODE_SECONDS", str(2 * 3600)))
+STREAM_CHUNK_SECONDS = float(os.getenv("STREAM_CHUNK_SECONDS", "30"))
+TRANSCRIBE_PARALLELISM = int(os.getenv("TRANSCRIBE_PARALLELISM", "1"))
+TRANSCRIBE_WINDOW_S = float(os.getenv("TRANSCRIBE_WINDOW_S", "30"))
+TRANSCRIBE_OVERLAP_S = float(os.getenv("TRANSCRIBE_OVERLAP_S", "2"))
+VAD_ENABLED = os.getenv("VAD_ENABLED", "0") == "1"
+VAD_CONFIG = VadConfig(
+    frame_ms=float(os.getenv("VAD_FRAME_MS", "30")),
+    relative_db=float(os.getenv("VAD_RELATIVE_DB", "-35")),
+    floor_db=float(os.getenv("VAD_FLOOR_DB", "-60")),
+    max_flatness=float(os.getenv("VAD_MAX_FLATNESS", "0.6")),
+    min_voice_ratio=float(os.getenv("VAD_MIN_VOICE_RATIO", "0.2")),
+    min_speech_s=float(os.getenv("VAD_MIN_SPEECH_S", "0.5")),
+    min_gap_s=float(os.getenv("VAD_MIN_GAP_S", "1.5")),
+    pad_s=float(os.getenv("VAD_PAD_S", "0.3")),
+)
+
+MODEL_WORKER_MODE = os.getenv("MODEL_WORKER_MODE", "thread")
+MODEL_WORKERS_SPEECH = int(os.getenv("MODEL_WORKERS_SPEECH", "1"))
+MODEL_WORKERS_EMOTION = int(os.getenv("MODEL_WORKERS_EMOTION", "1"))
+MODEL_WORKERS_KEYWORD = int(os.getenv("MODEL_WORKERS_KEYWORD", "1"))
+MODEL_WORKER_THREADS = int(os.getenv("MODEL_WORKER_THREADS", "0"))
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "pytorch")
+if INFERENCE_BACKEND not in BACKENDS:
+    raise RuntimeError(f"INFERENCE_BACKEND must be one of {', '.join(BACKENDS)}")
+INFERENCE = BackendConfig(
+    name=INFERENCE_BACKEND,
+    cache_dir=CACHE_DIR / "models",
+    intra_op_threads=int(os.getenv("INFERENCE_INTRA_OP_THREADS", "0")),
+    inter_op_threads=int(os.getenv("INFERENCE_INTER_OP_THREADS", "0")),
+)
+MODEL_LOAD_ORDER = [
+    name
+    for name in os.getenv("MODEL_LOAD_ORDER", "speech,emotion,keyword").split(",")
+    if name in ("speech", "emotion", "keyword")
+]
+MODEL_LOAD_CONCURRENCY = int(os.getenv("MODEL_LOAD_CONCURRENCY", "1"))
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "0") == "1"
+STARTUP_RECORD = CACHE_DIR / "startup.json"
+IO_THREADS = int(os.getenv("IO_THREADS", "0"))
+SPEECH_THREADS = int(os.getenv("SPEECH_THREADS", "1"))
+TEXT_MODEL_THREADS = int(os.getenv("TEXT_MODEL_THREADS", "2"))
+ANALYZE_MAX_CONCURRENT = int(os.getenv("ANALYZE_MAX_CONCURRENT", "4"))
+ANALYZE_MAX_QUEUE = int(os.getenv("ANALYZE_MAX_QUEUE", "16"))
+JOB_SUBMIT_MAX_CONCURRENT = int(os.getenv("JOB_SUBMIT_MAX_CONCURRENT", "8"))
+JOB_SUBMIT_MAX_QUEUE = int(os.getenv("JOB_SUBMIT_MAX_QUEUE", "32"))
+SEMANTIC_MAX_CONCURRENT = int(os.getenv("SEMANTIC_MAX_CONCURRENT", "16"))
+SEMANTIC_MAX_QUEUE = int(os.getenv("SEMANTIC_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+
+PEAKS_LEVELS = parse_levels(os.getenv("PEAKS_LEVELS", "160,640,2560,10240"))
+PEAKS_BITS = 16 if os.getenv("PEAKS_BITS", "8") == "16" else 8
+
+RENDITIONS_ENABLED = os.getenv("RENDITIONS_ENABLED", "0") == "1"
+RENDITION_DIR = Path(os.getenv("RENDITION_DIR", str(CACHE_DIR / "renditions")))
+RENDITION_CACHE_MAX_BYTES = int(os.getenv("RENDITION_CACHE_MAX_BYTES", str(2 * 1024**3)))
+RENDITION_BITRATE_KBPS = int(os.getenv("RENDITION_BITRATE_KBPS", "96"))
+RENDITION_FORMATS = os.getenv("RENDITION_FORMATS", "opus,aac").split(",")
+RENDITION_SEGMENT_SECONDS = float(os.getenv("RENDITION_SEGMENT_SECONDS", "6"))
+RENDITION_CONCURRENCY = int(os.getenv("RENDITION_CONCURRENCY", "1"))
+RENDITION_RETRY_SECONDS = float(os.getenv("RENDITION_RETRY_SECONDS", "3600"))
+
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "10"))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+KNN_CANDIDATE_FACTOR = int(os.getenv("KNN_CANDIDATE_FACTOR", "10"))
+KNN_MAX_CANDIDATES = 10000
+STAGE_CONCURRENCY = {
+    "convert": int(os.getenv("CONVERT_CONCURRENCY", "4")),
+    "transcribe": int(os.getenv("TRANSCRIBE_CONCURRENCY", "1")),
+    "analyze": int(os.getenv("ANALYZE_CONCURRENCY", "2")),
+}
 
 MAX_EMOTION_RESULTS = 3
 EMOTION_LABEL_MAP = {
@@ -69,21 +250,294 @@ LABEL_INDEX_MAP = {
 }
 
 app = FastAPI(title="Audio Analyzer API", version="1.0.0")
+app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR, check_dir=True), name="uploads")
+
+# Starlette wraps earlier middleware in later ones. Admission is added before
+# CORS so its 429s and 413s still get CORS headers and stay readable from the
+# browser, and it runs before any route handler, so rejected uploads are never
+# read or written.
+admission = {
+    "analyze": AdmissionLimit(
+        "analyze", ANALYZE_MAX_CONCURRENT, ANALYZE_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT
+    ),
+    "jobs": AdmissionLimit(
+        "jobs",
+        JOB_SUBMIT_MAX_CONCURRENT,
+        JOB_SUBMIT_MAX_QUEUE,
+        ADMISSION_QUEUE_TIMEOUT,
+        saturated=lambda: job_queue.depth >= JOB_MAX_PENDING,
+    ),
+    "semantic": AdmissionLimit(
+        "semantic", SEMANTIC_MAX_CONCURRENT, SEMANTIC_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT
+    ),
+}
+app.add_middleware(
+    AdmissionMiddleware,
+    routes=[
+        ("POST", "/api/analyze", admission["analyze"]),
+        ("POST", "/api/analyze/stream", admission["analyze"]),
+        ("POST", "/api/jobs", admission["jobs"]),
+        ("GET", "/api/search/semantic", admission["semantic"]),
+    ],
+    max_body=MAX_UPLOAD_BYTES,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Total-Count",
+        "X-Next-Cursor",
+        "X-Request-ID",
+        "Location",
+        "Upload-Offset",
+        "Upload-Length",
+        "X-Samples-Per-Pixel",
+        "Retry-After",
+    ],
 )
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR, check_dir=True), name="uploads")
 
-es_client = Elasticsearch(ES_NODE, api_key=ES_API_KEY)
+metrics = Registry("audio_")
+stage_seconds = metrics.register(
+    HistogramFamily(
+        "stage_seconds", "Time spent in each analysis stage", ("stage",), LATENCY_BUCKETS
+    )
+)
+es_request_seconds = metrics.register(
+    HistogramFamily(
+        "es_request_seconds", "Elasticsearch request latency by API", ("endpoint",), LATENCY_BUCKETS
+    )
+)
+es_request_errors = metrics.register(
+    Counter("es_request_errors_total", "Failed Elasticsearch requests by API", ("endpoint",))
+)
+model_load_seconds = metrics.register(
+    Gauge("model_load_seconds", "Time taken to load each model", ("model",))
+)
+http_in_flight = metrics.register(
+    Gauge("http_requests_in_flight", "Requests currently being served", ("route",))
+)
+http_request_seconds = metrics.register(
+    HistogramFamily(
+        "http_request_seconds", "Request latency by route", ("route", "method"), LATENCY_BUCKETS
+    )
+)
+http_responses = metrics.register(
+    Counter("http_responses_total", "Responses by route and status", ("route", "method", "status"))
+)
+# File and cache I/O use the default executor; model inference gets its own
+# pools so a burst of analyses cannot take the threads other endpoints need.
+executors = {
+    "io": TrackedThreadPoolExecutor("audio-io", IO_THREADS or None),
+    "speech": TrackedThreadPoolExecutor("audio-speech", max(1, SPEECH_THREADS)),
+    "text": TrackedThreadPoolExecutor("audio-text", max(1, TEXT_MODEL_THREADS)),
+}
+io_executor = executors["io"]
+speech_executor = executors["speech"]
+text_executor = executors["text"]
+metrics.register(
+    Gauge(
+        "executor_queued_tasks",
+        "Work items waiting for a thread",
+        ("executor",),
+        fn=lambda: {(name,): pool.queued for name, pool in executors.items()},
+    )
+)
+metrics.register(
+    Gauge(
+        "executor_active_tasks",
+        "Work items running on a thread",
+        ("executor",),
+        fn=lambda: {(name,): pool.active for name, pool in executors.items()},
+    )
+)
+metrics.register(
+    Gauge(
+        "admission_active_requests",
+        "Admitted requests still running",
+        ("endpoint",),
+        fn=lambda: {(name,): limit.active for name, limit in admission.items()},
+    )
+)
+metrics.register(
+    Gauge(
+        "admission_queued_requests",
+        "Requests waiting for admission",
+        ("endpoint",),
+        fn=lambda: {(name,): limit.waiting for name, limit in admission.items()},
+    )
+)
+metrics.register(
+    Counter(
+        "admission_rejected_total",
+        "Requests rejected with 429, including queue timeouts",
+        ("endpoint",),
+        fn=lambda: {
+            (name,): limit.rejected + limit.timed_out for name, limit in admission.items()
+        },
+    )
+)
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+app.add_middleware(
+    RequestMetricsMiddleware,
+    route_of=route_template,
+    in_flight=http_in_flight,
+    duration=http_request_seconds,
+    responses=http_responses,
+    trace_ids=TRACE_IDS_ENABLED,
+)
+
+es_client: AsyncElasticsearch | None = None
+analysis_cache = AnalysisCache(CACHE_DIR / "analysis.sqlite3", ANALYSIS_CACHE_MAX_BYTES)
+read_cache = ResultCache(READ_CACHE_MAX_ENTRIES, READ_CACHE_TTL)
+stream_first_partial = Histogram(
+    "stream_first_partial_seconds",
+    "Time from stream start to the first partial transcript",
+    LATENCY_BUCKETS,
+)
+vad_skipped = Histogram(
+    "vad_skipped_ratio", "Fraction of decoded audio skipped by voice-activity detection", RATIO_BUCKETS
+)
+metrics.register(stream_first_partial)
+metrics.register(vad_skipped)
+upload_store = UploadStore(UPLOAD_DIR, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_MAX_BYTES)
+upload_reaper: asyncio.Task | None = None
+reaped_uploads = metrics.register(
+    Counter("uploads_reaped_total", "Files removed by the upload reaper", ("kind",))
+)
+renditions: RenditionStore | None = None
+if RENDITIONS_ENABLED:
+    renditions = RenditionStore(
+        RENDITION_DIR,
+        RENDITION_CACHE_MAX_BYTES,
+        RENDITION_BITRATE_KBPS,
+        RENDITION_FORMATS,
+        RENDITION_SEGMENT_SECONDS,
+        RENDITION_CONCURRENCY,
+        RENDITION_RETRY_SECONDS,
+    )
 _speech_pipeline = None
 _emotion_pipeline = None
 _keyword_model = None
 speech_lock = asyncio.Lock()
 emotion_lock = asyncio.Lock()
 keyword_lock = asyncio.Lock()
+model_load_slots = asyncio.Semaphore(max(1, MODEL_LOAD_CONCURRENCY))
+model_status: Dict[str, Dict[str, Any]] = {
+    name: {"state": "pending"} for name in ("speech", "emotion", "keyword")
+}
+warm_up_status: Dict[str, Any] = {"state": "pending" if WARMUP_ENABLED else "disabled"}
+stage_slots = {name: asyncio.Semaphore(limit) for name, limit in STAGE_CONCURRENCY.items()}
+peaks_building: Dict[str, asyncio.Task] = {}
+model_workers: ModelWorkerPool | None = None
+if MODEL_WORKER_MODE == "process":
+    model_workers = ModelWorkerPool(
+        SPEECH_MODEL,
+        EMOTION_MODEL,
+        KEYWORD_MODEL,
+        speech_processes=MODEL_WORKERS_SPEECH,
+        emotion_processes=MODEL_WORKERS_EMOTION,
+        keyword_processes=MODEL_WORKERS_KEYWORD,
+        threads_per_process=MODEL_WORKER_THREADS,
+        backend=INFERENCE,
+    )
+
+
+class InstrumentedElasticsearch(AsyncElasticsearch):
+    # Every API method, including namespaced ones like indices.*, funnels
+    # through perform_request, so this times each ES call by endpoint.
+    async def perform_request(self, method: str, path: str, **kwargs: Any) -> Any:
+        endpoint = kwargs.get("endpoint_id") or method
+        try:
+            with es_request_seconds.time(endpoint=endpoint):
+                return await super().perform_request(method, path, **kwargs)
+        except Exception:
+            es_request_errors.inc(endpoint=endpoint)
+            raise
+
+
+def build_es_client() -> AsyncElasticsearch:
+    # aiohttp keeps up to ES_CONNECTIONS_PER_NODE sockets alive per node and
+    # reuses them across requests.
+    return InstrumentedElasticsearch(
+        ES_NODE,
+        api_key=ES_API_KEY,
+        connections_per_node=ES_CONNECTIONS_PER_NODE,
+        request_timeout=ES_REQUEST_TIMEOUT,
+        max_retries=ES_MAX_RETRIES,
+        retry_on_timeout=ES_RETRY_ON_TIMEOUT,
+        http_compress=ES_HTTP_COMPRESS,
+    )
+
+
+def invalidate_read_cache() -> None:
+    # Bump again once ES has refreshed, so reads that raced the write and
+    # cached pre-refresh results are dropped too.
+    read_cache.invalidate()
+    asyncio.get_running_loop().call_later(ES_REFRESH_INTERVAL, read_cache.invalidate)
+
+
+SEARCH_FIELDS = ["transcription", "primaryEmotions", "title", "keywords"]
+ITEMS_SORT = [{"timestamp": {"order": "desc"}}]
+SEARCH_SORT = [{"_score": {"order": "desc"}}]
+
+
+def build_text_query(q: str) -> Dict[str, Any]:
+    if not q:
+        return {"match_all": {}}
+    return {"multi_match": {"query": q, "fields": SEARCH_FIELDS}}
+
+
+async def fetch_cursor_page(
+    kind: str, q: str, size: int, cursor: str, count: bool
+) -> Tuple[List[Dict[str, Any]], str | None, int | None]:
+    if cursor == START:
+        pit = await es_client.open_point_in_time(index=ES_INDEX, keep_alive=PIT_KEEP_ALIVE)
+        state = {"kind": kind, "q": q, "pit": pit["id"], "after": None}
+    else:
+        try:
+            state = decode_cursor(cursor)
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        if state.get("kind") != kind:
+            raise HTTPException(status_code=400, detail="Cursor belongs to another endpoint")
+    params: Dict[str, Any] = {}
+    if state["after"] is not None:
+        params["search_after"] = state["after"]
+    sort = SEARCH_SORT if kind == "search" else ITEMS_SORT
+    try:
+        resp = await es_client.search(
+            pit={"id": state["pit"], "keep_alive": PIT_KEEP_ALIVE},
+            size=size,
+            query=build_text_query(state.get("q") or ""),
+            sort=[*sort, {"_shard_doc": {"order": "asc"}}],
+            track_total_hits=count,
+            source_excludes=["transcriptionVector"],
+            **params,
+        )
+    except NotFoundError:
+        raise HTTPException(status_code=410, detail="Cursor expired")
+    pit_id = resp.get("pit_id", state["pit"])
+    hits = resp.get("hits", {}).get("hits", [])
+    total = resp.get("hits", {}).get("total", {}).get("value") if count else None
+    if len(hits) < size:
+        try:
+            await es_client.close_point_in_time(id=pit_id)
+        except Exception as exc:  # noqa: BLE001
+            log.warning("Failed to close point in time: %s", exc)
+        return hits, None, total
+    next_cursor = encode_cursor({**state, "pit": pit_id, "after": hits[-1]["sort"]})
+    return hits, next_cursor, total
 
 
 def derive_track_id(source_name: str | None, stored_path: Path) -> str:
@@ -95,42 +549,31 @@ def derive_track_id(source_name: str | None, stored_path: Path) -> str:
 
 def extract_media_metadata(original_name: str | None, stored_path: Path) -> Dict[str, Any]:
     metadata: Dict[str, Any] = {"trackId": derive_track_id(original_name, stored_path)}
-    cmd = [
-        "ffprobe",
-        "-v",
-        "error",
-        "-select_streams",
-        "a:0",
-        "-show_entries",
-        "format=duration,bit_rate",
-        "-of",
-        "json",
-        str(stored_path),
-    ]
     try:
-        proc = subprocess.run(cmd, capture_output=True, text=True, check=False)
-        if proc.returncode == 0 and proc.stdout:
-            data = json.loads(proc.stdout)
-            fmt = data.get("format", {}) if isinstance(data, dict) else {}
-            duration = fmt.get("duration")
-            bit_rate = fmt.get("bit_rate")
-            if duration is not None:
-                try:
-                    metadata["duration"] = round(float(duration), 3)
-                except (TypeError, ValueError):
-                    pass
-            if bit_rate is not None:
-                try:
-                    metadata["bitRate"] = int(round(float(bit_rate) / 1000))
-                except (TypeError, ValueError):
-                    pass
-    except FileNotFoundError:
-        log.warning("ffprobe not found; skipping media metadata extraction")
-    except Exception as exc:  # noqa: BLE001
+        with stage_seconds.time(stage="probe"):
+            probe = probe_media(stored_path)
+    except OSError as exc:
         log.warning("Metadata extraction failed: %s", exc)
+        probe = None
+    if probe:
+        metadata.update(probe)
     return metadata
 
 
+def complete_media_metadata(metadata: Dict[str, Any], stored_path: Path, samples: int) -> None:
+    # Containers the header parser does not understand get their duration from
+    # the samples ffmpeg decoded anyway, rather than from a separate ffprobe run.
+    if "duration" in metadata or not samples or samples >= MAX_DECODE_SECONDS * SAMPLE_RATE:
+        return
+    duration = samples / SAMPLE_RATE
+    probe = {
+        "duration": round(duration, 3),
+        "bitRate": int(round(stored_path.stat().st_size * 8 / duration / 1000)),
+    }
+    remember_probe(stored_path, probe)
+    metadata.update(probe)
+
+
 def normalize_emotion_label(label: str) -> str:
     cleaned = label.replace("_", " ").strip().lower()
     return EMOTION_LABEL_MAP.get(cleaned, label.strip())
@@ -162,11 +605,8 @@ def resolve_emotion_label(raw_label: str, classifier=None) -> str:
     return trimmed
 
 
-async def ensure_index() -> None:
-    exists = await asyncio.to_thread(es_client.indices.exists, index=ES_INDEX)
-    if exists:
-        return
-    mapping = {
+def index_definition() -> Dict[str, Any]:
+    return {
         "settings": {
             "number_of_shards": 1,
             "analysis": {"analyzer": {"default": {"type": "standard"}}},
@@ -174,6 +614,10 @@ async def ensure_index() -> None:
         "mappings": {
             "properties": {
                 "fileName": {"type": "text"},
+                "storedFileName": {
+                    "type": "text",
+                    "fields": {"keyword": {"type": "keyword", "ignore_above": 256}},
+                },
                 "transcription": {"type": "text"},
                 "transcriptionVector": {
                     "type": "dense_vector",
@@ -197,8 +641,48 @@ async def ensure_index() -> None:
             }
         },
     }
-    await asyncio.to_thread(es_client.indices.create, index=ES_INDEX, **mapping)
-    log.info("Created index %s", ES_INDEX)
+
+
+async def ensure_index() -> None:
+    exists = await es_client.indices.exists(index=ES_INDEX)
+    if exists:
+        return
+    index = versioned_name(ES_INDEX)
+    await es_client.indices.create(index=index, aliases={ES_INDEX: {}}, **index_definition())
+    log.info("Created index %s behind alias %s", index, ES_INDEX)
+
+
+async def load_model(name: str, build: Callable[[], Any]) -> Any:
+    # transformers, keybert and torch are only imported here, on first use,
+    # so importing this module stays cheap. Loads share MODEL_LOAD_CONCURRENCY
+    # slots and queue in FIFO order to bound peak memory.
+    async with model_load_slots:
+        model_status[name] = {"state": "loading"}
+        log.info("Loading %s model", name)
+        started = time.perf_counter()
+        try:
+            model = await asyncio.to_thread(build)
+        except Exception as exc:
+            model_status[name] = {"state": "failed", "error": str(exc)}
+            raise
+        seconds = time.perf_counter() - started
+    model_load_seconds.set(seconds, model=name)
+    model_status[name] = {"state": "ready", "loadSeconds": round(seconds, 3)}
+    return model
+
+
+def _build_speech_pipeline():
+    return build_pipeline(SPEECH_TASK, SPEECH_MODEL, INFERENCE)
+
+
+def _build_emotion_pipeline():
+    return build_pipeline(TEXT_TASK, EMOTION_MODEL, INFERENCE)
+
+
+def _build_keyword_model():
+    from keybert import KeyBERT
+
+    return KeyBERT(KEYWORD_MODEL)
 
 
 async def get_speech_pipeline():
@@ -208,10 +692,7 @@ async def get_speech_pipeline():
     async with speech_lock:
         if _speech_pipeline:
             return _speech_pipeline
-        log.info("Loading whisper tiny pipeline")
-        _speech_pipeline = await asyncio.to_thread(
-            pipeline, "automatic-speech-recognition", "openai/whisper-tiny"
-        )
+        _speech_pipeline = await load_model("speech", _build_speech_pipeline)
     return _speech_pipeline
 
 
@@ -222,12 +703,7 @@ async def get_emotion_pipeline():
     async with emotion_lock:
         if _emotion_pipeline:
             return _emotion_pipeline
-        log.info("Loading sentiment pipeline")
-        _emotion_pipeline = await asyncio.to_thread(
-            pipeline,
-            "text-classification",
-            "songhieng/khmer-xlmr-base-sentimental-multi-label",
-        )
+        _emotion_pipeline = await load_model("emotion", _build_emotion_pipeline)
     return _emotion_pipeline
 
 
@@ -238,13 +714,12 @@ async def get_keyword_model():
     async with keyword_lock:
         if _keyword_model:
             return _keyword_model
-        log.info("Loading KeyBERT model")
-        _keyword_model = await asyncio.to_thread(KeyBERT)
+        _keyword_model = await load_model("keyword", _build_keyword_model)
     return _keyword_model
 
 
 async def convert_to_wav(src: Path) -> Path:
-    wav_path = src.with_suffix(".wav")
+    wav_path = src.with_name(f"{src.name}.{secrets.token_hex(4)}.wav")
     cmd = [
         "ffmpeg",
         "-y",
@@ -258,16 +733,17 @@ async def convert_to_wav(src: Path) -> Path:
         "s16",
         str(wav_path),
     ]
-    proc = await asyncio.to_thread(
-        subprocess.run, cmd, capture_output=True, text=True, check=False
-    )
+    with stage_seconds.time(stage="ffmpeg_convert"):
+        proc = await asyncio.to_thread(
+            subprocess.run, cmd, capture_output=True, text=True, check=False
+        )
     if proc.returncode != 0:
         raise RuntimeError(proc.stderr.strip() or "ffmpeg conversion failed")
     return wav_path
 
 
 def _load_audio_array(path: Path) -> Tuple[np.ndarray, int]:
-    with wave.open(str(path), "rb") as wav_file:
+    with stage_seconds.time(stage="wav_read"), wave.open(str(path), "rb") as wav_file:
         sample_rate = wav_file.getframerate()
         num_channels = wav_file.getnchannels()
         sample_width = wav_file.getsampwidth()
@@ -290,15 +766,166 @@ def _load_audio_array(path: Path) -> Tuple[np.ndarray, int]:
     return audio, sample_rate
 
 
-async def transcribe_audio(wav_path: Path) -> str:
+def _pcm_decode_cmd(src: Path) -> List[str]:
+    return [
+        "ffmpeg",
+        "-nostdin",
+        "-v",
+        "error",
+        "-i",
+        str(src),
+        "-t",
+        str(MAX_DECODE_SECONDS),
+        "-ac",
+        "1",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-f",
+        "f32le",
+        "pipe:1",
+    ]
+
+
+async def iter_audio_chunks(
+    src: Path, chunk_seconds: float = DECODE_CHUNK_SECONDS
+) -> AsyncIterator[np.ndarray]:
+    # Yields mono float32 PCM at SAMPLE_RATE straight from ffmpeg's stdout.
+    # Only one chunk (chunk_seconds * SAMPLE_RATE * 4 bytes) is held at a time.
+    chunk_bytes = max(1, int(chunk_seconds * SAMPLE_RATE)) * 4
+    proc = await asyncio.create_subprocess_exec(
+        *_pcm_decode_cmd(src),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stderr_task = asyncio.create_task(proc.stderr.read())
+    try:
+        while True:
+            try:
+                data = await proc.stdout.readexactly(chunk_bytes)
+            except asyncio.IncompleteReadError as exc:
+                data = exc.partial[: len(exc.partial) // 4 * 4]
+                if data:
+                    yield np.frombuffer(data, dtype=np.float32)
+                break
+            yield np.frombuffer(data, dtype=np.float32)
+        returncode = await proc.wait()
+        stderr = (await stderr_task).decode(errors="replace").strip()
+        if returncode != 0:
+            raise RuntimeError(stderr or "ffmpeg decoding failed")
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        if not stderr_task.done():
+            stderr_task.cancel()
+
+
+async def decode_audio(src: Path, duration: float | None = None) -> np.ndarray:
+    # Peak memory is the output buffer plus one decode chunk. The buffer is
+    # sized from the probed duration (4 bytes per sample at 16 kHz, ~230 MB
+    # for an hour) and ffmpeg is cut off at MAX_DECODE_SECONDS, so it can
+    # never exceed MAX_DECODE_SECONDS * SAMPLE_RATE * 4 bytes.
+    limit = int(MAX_DECODE_SECONDS * SAMPLE_RATE)
+    estimate = int((duration or 0) * SAMPLE_RATE) + SAMPLE_RATE
+    buffer = np.empty(min(max(estimate, 60 * SAMPLE_RATE), limit), dtype=np.float32)
+    filled = 0
+    with stage_seconds.time(stage="ffmpeg_decode"):
+        async for chunk in iter_audio_chunks(src):
+            chunk = chunk[: limit - filled]
+            needed = filled + chunk.size
+            if needed > buffer.size:
+                grown = np.empty(min(max(needed, buffer.size * 2), limit), dtype=np.float32)
+                grown[:filled] = buffer[:filled]
+                buffer = grown
+            buffer[filled:needed] = chunk
+            filled = needed
+    if filled >= limit:
+        log.warning("Decoded audio truncated to %s seconds", MAX_DECODE_SECONDS)
+    if filled < buffer.size * 0.9:
+        return buffer[:filled].copy()
+    return buffer[:filled]
+
+
+async def load_audio(src: Path, duration: float | None = None) -> np.ndarray:
+    if AUDIO_DECODE_MODE == "wav":
+        wav_path = await convert_to_wav(src)
+        try:
+            audio, _ = await asyncio.to_thread(_load_audio_array, wav_path)
+        finally:
+            wav_path.unlink(missing_ok=True)
+        return audio
+    return await decode_audio(src, duration)
+
+
+async def run_speech_pipeline(audio_array: np.ndarray, sample_rate: int, **kwargs: Any) -> Any:
+    if model_workers is not None:
+        with stage_seconds.time(stage="whisper"):
+            return await model_workers.transcribe(audio_array, sample_rate, **kwargs)
     pipeline_obj = await get_speech_pipeline()
-    audio_array, sample_rate = await asyncio.to_thread(_load_audio_array, wav_path)
-    result = await asyncio.to_thread(
-        pipeline_obj,
-        {"array": audio_array, "sampling_rate": sample_rate},
-        chunk_length_s=30,
-        stride_length_s=(6, 2),
+    with stage_seconds.time(stage="whisper"):
+        return await run_in(
+            speech_executor,
+            pipeline_obj,
+            {"array": audio_array, "sampling_rate": sample_rate},
+            **kwargs,
+        )
+
+
+async def apply_vad(
+    audio_array: np.ndarray, sample_rate: int
+) -> Tuple[np.ndarray, Timeline]:
+    with stage_seconds.time(stage="vad"):
+        packed, timeline, skipped = await run_in(
+            speech_executor, pack_speech, audio_array, sample_rate, VAD_CONFIG
+        )
+    vad_skipped.observe(skipped)
+    log.info(
+        "VAD kept %.1fs of %.1fs (skipped %.1f%%)",
+        timeline.speech_seconds,
+        audio_array.size / sample_rate,
+        skipped * 100,
     )
+    return packed, timeline
+
+
+async def transcribe_audio(audio_array: np.ndarray, sample_rate: int = SAMPLE_RATE) -> str:
+    if VAD_ENABLED:
+        audio_array, _ = await apply_vad(audio_array, sample_rate)
+        if audio_array.size == 0:
+            return ""
+    if TRANSCRIBE_PARALLELISM > 1 and audio_array.size > TRANSCRIBE_WINDOW_S * sample_rate:
+        return await transcribe_parallel(audio_array, sample_rate, TRANSCRIBE_PARALLELISM)
+    result = await run_speech_pipeline(audio_array, sample_rate, **SPEECH_CHUNKING)
+    return transcription_text(result)
+
+
+async def transcribe_parallel(
+    audio_array: np.ndarray, sample_rate: int, parallelism: int
+) -> str:
+    # Process mode fans windows out across the speech worker processes; thread
+    # mode hands them to the pipeline as one batch so torch spreads the work
+    # over its intra-op threads.
+    windows = split_windows(audio_array, sample_rate, TRANSCRIBE_WINDOW_S, TRANSCRIBE_OVERLAP_S)
+    if model_workers is not None:
+        slots = asyncio.Semaphore(parallelism)
+
+        async def transcribe_window(window: np.ndarray) -> str:
+            async with slots:
+                return transcription_text(await model_workers.transcribe(window, sample_rate))
+
+        texts = await asyncio.gather(*(transcribe_window(window) for window in windows))
+    else:
+        pipeline_obj = await get_speech_pipeline()
+        inputs = [{"array": window, "sampling_rate": sample_rate} for window in windows]
+        with stage_seconds.time(stage="whisper"):
+            results = await run_in(speech_executor, pipeline_obj, inputs, batch_size=parallelism)
+        texts = [transcription_text(result) for result in results]
+    text = stitch_texts(texts)
+    log.info("Parallel transcription stitched %s windows into %s chars", len(windows), len(text))
+    return text
+
+
+def transcription_text(result: Any) -> str:
     if isinstance(result, str):
         text = result.strip()
         log.info("Transcription produced %s chars (string)", len(text))
@@ -326,13 +953,83 @@ async def transcribe_audio(wav_path: Path) -> str:
     raise RuntimeError("Unexpected transcription response")
 
 
-async def extract_keywords(text: str) -> List[str]:
+def _classify_batch(texts: List[str]) -> List[Any]:
+    outputs = _emotion_pipeline(texts, top_k=8, batch_size=len(texts), truncation=True)
+    return list(outputs)
+
+
+def _keyword_batch(texts: List[str]) -> List[Any]:
+    embeddings = _keyword_model.model.embed(texts)
+    pairs = _keyword_model.extract_keywords(texts, top_n=5, doc_embeddings=embeddings)
+    pairs = [pairs] if len(texts) == 1 else list(pairs)
+    return [(keywords, vector.tolist()) for keywords, vector in zip(pairs, embeddings)]
+
+
+def _embed_texts(texts: List[str]) -> List[List[float]]:
+    return _keyword_model.model.embed(texts).tolist()
+
+
+if model_workers is not None:
+    emotion_batcher = MicroBatcher(
+        "emotion",
+        partial(worker_tasks.classify_batch, top_k=8),
+        BATCH_MAX_SIZE,
+        BATCH_WINDOW_MS / 1000,
+        executor=model_workers.emotion,
+    )
+    keyword_batcher = MicroBatcher(
+        "keyword",
+        partial(worker_tasks.keyword_batch, top_n=5),
+        BATCH_MAX_SIZE,
+        BATCH_WINDOW_MS / 1000,
+        executor=model_workers.keyword,
+    )
+else:
+    emotion_batcher = MicroBatcher(
+        "emotion", _classify_batch, BATCH_MAX_SIZE, BATCH_WINDOW_MS / 1000, text_executor
+    )
+    keyword_batcher = MicroBatcher(
+        "keyword", _keyword_batch, BATCH_MAX_SIZE, BATCH_WINDOW_MS / 1000, text_executor
+    )
+for batcher in (emotion_batcher, keyword_batcher):
+    metrics.register(batcher.batch_size)
+    metrics.register(batcher.queue_wait)
+    metrics.register(batcher.run_time)
+metrics.register(
+    Gauge(
+        "batcher_pending_items",
+        "Items waiting to join a model batch",
+        ("batcher",),
+        fn=lambda: {(b.name,): b.depth() for b in (emotion_batcher, keyword_batcher)},
+    )
+)
+
+
+query_embedding_cache = LRUCache(QUERY_EMBEDDING_CACHE_SIZE)
+
+
+async def extract_keywords(text: str) -> Tuple[List[str], List[float] | None]:
     trimmed = text.strip()
     if not trimmed:
-        return []
-    model = await get_keyword_model()
-    pairs = await asyncio.to_thread(model.extract_keywords, trimmed, top_n=5)
-    return [word for word, _ in pairs]
+        return [], None
+    if model_workers is None:
+        await get_keyword_model()
+    pairs, vector = await keyword_batcher.submit(trimmed)
+    return [word for word, _ in pairs], vector
+
+
+async def embed_query(text: str) -> List[float]:
+    key = " ".join(text.lower().split())
+    cached = query_embedding_cache.get(key)
+    if cached is not None:
+        return cached
+    if model_workers is not None:
+        vectors = await run_in(model_workers.keyword, worker_tasks.embed_texts, [key])
+    else:
+        await get_keyword_model()
+        vectors = await run_in(text_executor, _embed_texts, [key])
+    query_embedding_cache.set(key, vectors[0])
+    return vectors[0]
 
 
 async def analyze_text(text: str) -> Dict[str, Any]:
@@ -345,8 +1042,16 @@ async def analyze_text(text: str) -> Dict[str, Any]:
             "primaryEmotions": [],
             "scores": {},
         }
-    classifier = await get_emotion_pipeline()
-    outputs = await asyncio.to_thread(classifier, trimmed, top_k=8)
+    classifier = None if model_workers is not None else await get_emotion_pipeline()
+
+    async def timed(stage: str, awaitable: Awaitable[Any]) -> Any:
+        with stage_seconds.time(stage=stage):
+            return await awaitable
+
+    outputs, (keywords, vector) = await asyncio.gather(
+        timed("classifier", emotion_batcher.submit(trimmed)),
+        timed("keywords", extract_keywords(trimmed)),
+    )
     rows = outputs if isinstance(outputs, list) else [outputs]
     normalized = []
     for item in rows:
@@ -373,41 +1078,381 @@ async def analyze_text(text: str) -> Dict[str, Any]:
         if name not in ordered:
             ordered.append(name)
         scores[name] = max(item["score"], scores.get(name, 0))
-    keywords = await extract_keywords(trimmed)
     confidence = int(round(top[0]["score"] * 100)) if top else 0
-    return {
+    result = {
         "confidence": confidence,
         "keywords": keywords,
         "emotions": ordered,
         "primaryEmotions": ordered,
         "scores": {k: round(v, 4) for k, v in scores.items()},
     }
-
-
-async def save_upload(file: UploadFile) -> Path:
-    token = secrets.token_hex(16)
-    target = UPLOAD_DIR / token
-    async with asyncio.Lock():
-        with target.open("wb") as buffer:
+    if vector is not None:
+        result["transcriptionVector"] = vector
+    return result
+
+
+async def save_upload(file: UploadFile) -> Tuple[Path, str]:
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        await file.close()
+        raise HTTPException(status_code=413, detail="Upload exceeds the size limit")
+    hasher = hashlib.sha256()
+    tmp_path = upload_store.temp_path()
+    written = 0
+    try:
+        with stage_seconds.time(stage="upload_write"), tmp_path.open("wb") as buffer:
             while chunk := await file.read(1024 * 1024):
+                written += len(chunk)
+                if written > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="Upload exceeds the size limit")
+                hasher.update(chunk)
                 buffer.write(chunk)
-    await file.close()
-    return target
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        await file.close()
+    digest = hasher.hexdigest()
+    return upload_store.store(tmp_path, digest), digest
+
+
+def build_peaks(stored: Path, audio: np.ndarray) -> None:
+    builder = PeakBuilder(PEAKS_LEVELS)
+    builder.add(audio)
+    write_peaks(stored, builder.finish(), SAMPLE_RATE, PEAKS_BITS)
+
+
+async def store_peaks(stored: Path, audio: np.ndarray) -> None:
+    if not PEAKS_LEVELS:
+        return
+    try:
+        with stage_seconds.time(stage="peaks"):
+            await asyncio.to_thread(build_peaks, stored, audio)
+    except OSError as exc:
+        log.warning("Could not write peaks for %s: %s", stored.name, exc)
+
+
+async def ensure_peaks(stored: Path) -> None:
+    """Decode and compute peaks for uploads analysed before peaks existed."""
+    task = peaks_building.get(stored.name)
+    if task is None:
+
+        async def build() -> None:
+            try:
+                async with stage_slots["convert"]:
+                    audio = await load_audio(stored)
+                await store_peaks(stored, audio)
+            finally:
+                peaks_building.pop(stored.name, None)
+
+        task = peaks_building[stored.name] = asyncio.create_task(build())
+    await asyncio.shield(task)
+
+
+def model_fingerprint() -> str:
+    parts = [SPEECH_MODEL, EMOTION_MODEL, KEYWORD_MODEL, ANALYSIS_VERSION]
+    if INFERENCE_BACKEND != "pytorch":
+        # Quantized and ONNX outputs differ slightly, so they get their own cache entries.
+        parts.append(INFERENCE_BACKEND)
+    fingerprint = "|".join(parts)
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+
+def analysis_cache_key(digest: str, streamed: bool = False) -> str:
+    # Streamed transcripts come from hard-cut chunks without overlap, so they
+    # are cached apart from full analyses and never served to /api/analyze.
+    suffix = ":stream" if streamed else ""
+    return f"{digest}:{model_fingerprint()}{suffix}"
+
+
+async def run_analysis(
+    stored: Path,
+    digest: str,
+    file_name: str | None,
+    progress: Callable[[str], Awaitable[None]] | None = None,
+) -> Tuple[Dict[str, Any], bool]:
+    async def enter(stage: str) -> None:
+        if progress is not None:
+            await progress(stage)
+
+    cache_key = analysis_cache_key(digest)
+    with stage_seconds.time(stage="cache_lookup"):
+        cached = await asyncio.to_thread(analysis_cache.get, cache_key)
+    if cached is not None:
+        transcription = cached["transcription"]
+        analysis = cached["analysis"]
+        media_metadata = {**cached["media"], "trackId": derive_track_id(file_name, stored)}
+    else:
+        media_metadata = await asyncio.to_thread(extract_media_metadata, file_name, stored)
+        await enter("convert")
+        async with stage_slots["convert"]:
+            audio = await load_audio(stored, media_metadata.get("duration"))
+        complete_media_metadata(media_metadata, stored, audio.size)
+        await store_peaks(stored, audio)
+        await enter("transcribe")
+        async with stage_slots["transcribe"]:
+            transcription = await transcribe_audio(audio)
+        del audio
+        await enter("analyze")
+        async with stage_slots["analyze"]:
+            analysis = await analyze_text(transcription)
+        await store_analysis(digest, transcription, analysis, media_metadata)
+    result = analysis_result(stored, file_name, transcription, analysis, media_metadata)
+    return result, cached is not None
+
+
+async def store_analysis(
+    digest: str,
+    transcription: str,
+    analysis: Dict[str, Any],
+    media_metadata: Dict[str, Any],
+    streamed: bool = False,
+) -> None:
+    media = {k: v for k, v in media_metadata.items() if k != "trackId"}
+    await asyncio.to_thread(
+        analysis_cache.put,
+        analysis_cache_key(digest, streamed),
+        digest,
+        {"transcription": transcription, "analysis": analysis, "media": media},
+    )
+
+
+def analysis_result(
+    stored: Path,
+    file_name: str | None,
+    transcription: str,
+    analysis: Dict[str, Any],
+    media_metadata: Dict[str, Any],
+) -> Dict[str, Any]:
+    if renditions is not None:
+        renditions.schedule(stored.name, stored)
+    return {
+        "fileName": file_name,
+        "storedFileName": stored.name,
+        "storedPath": f"uploads/{upload_store.relative(stored)}",
+        "transcription": transcription,
+        **analysis,
+        **media_metadata,
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+async def run_analysis_job(
+    payload: Dict[str, Any], progress: Callable[[str], Awaitable[None]]
+) -> Dict[str, Any]:
+    stored = upload_store.resolve(payload["storedFileName"])
+    if stored is None:
+        raise RuntimeError(f"Stored upload {payload['storedFileName']} is missing")
+    result, _ = await run_analysis(stored, payload["digest"], payload.get("fileName"), progress)
+    return result
+
+
+async def reindex_track(name: str, stored: Path) -> Dict[str, Any]:
+    digest = name if CONTENT_DIGEST.match(name) else await asyncio.to_thread(sha256_file, stored)
+    result, _ = await run_analysis(stored, digest, None)
+    return {field: result[field] for field in REINDEX_FIELDS if field in result}
+
+
+reindexer = Reindexer(
+    JOBS_DIR / "reindex.json",
+    ES_INDEX,
+    index_definition,
+    lambda: upload_store.iter_stored(0),
+    reindex_track,
+    REINDEX_CONCURRENCY,
+    REINDEX_BATCH_SIZE,
+    preserve=REINDEX_FIELDS,
+    on_swap=lambda: invalidate_read_cache(),
+)
+metrics.register(
+    Gauge(
+        "reindex_tracks_per_minute",
+        "Throughput of the current or last reindex job",
+        fn=lambda: reindexer.tracks_per_minute(),
+    )
+)
+
+
+job_queue = JobQueue(
+    JobStore(JOBS_DIR),
+    run_analysis_job,
+    workers=JOB_WORKERS,
+    max_pending=JOB_MAX_PENDING,
+    retention=JOB_RETENTION_SECONDS,
+)
+metrics.register(
+    Gauge("job_queue_depth", "Analysis jobs waiting for a worker", fn=lambda: job_queue.depth)
+)
+
+
+async def find_orphans(names: List[str]) -> List[str]:
+    # Several documents can share one stored file, so collect names from a
+    # terms aggregation rather than from a page of hits.
+    resp = await es_client.search(
+        index=ES_INDEX,
+        query={"terms": {"storedFileName.keyword": names}},
+        aggs={"referenced": {"terms": {"field": "storedFileName.keyword", "size": len(names)}}},
+        size=0,
+    )
+    buckets = resp["aggregations"]["referenced"]["buckets"]
+    referenced = {bucket["key"] for bucket in buckets}
+    return [name for name in names if name not in referenced]
+
+
+def remove_stored(paths: List[Path]) -> None:
+    for path in paths:
+        path.unlink(missing_ok=True)
+        remove_peaks(path)
+        if renditions is not None:
+            renditions.discard(path.name)
+
+
+async def reap_uploads() -> Dict[str, int]:
+    partials = await asyncio.to_thread(upload_store.reap_incoming, UPLOAD_SESSION_TTL)
+    reaped_uploads.inc(partials, kind="partial")
+    orphans = 0
+    shards = upload_store.iter_stored(UPLOAD_ORPHAN_GRACE_SECONDS)
+    while (item := await asyncio.to_thread(next, shards, None)) is not None:
+        _, shard = item
+        for start in range(0, len(shard), UPLOAD_REAP_BATCH):
+            paths = dict(shard[start : start + UPLOAD_REAP_BATCH])
+            try:
+                missing = await find_orphans(list(paths))
+            except Exception as exc:  # noqa: BLE001
+                log.warning("Upload reaper skipped %d files: %s", len(paths), exc)
+                continue
+            await asyncio.to_thread(remove_stored, [paths[name] for name in missing])
+            orphans += len(missing)
+    reaped_uploads.inc(orphans, kind="orphan")
+    return {"partials": partials, "orphans": orphans}
+
+
+async def upload_reaper_loop() -> None:
+    while True:
+        try:
+            result = await reap_uploads()
+            if result["partials"] or result["orphans"]:
+                log.info(
+                    "Upload reaper removed %d partials and %d orphans",
+                    result["partials"],
+                    result["orphans"],
+                )
+        except Exception as exc:  # noqa: BLE001
+            log.error("Upload reaper failed: %s", exc)
+        await asyncio.sleep(UPLOAD_REAP_INTERVAL)
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    if upload_reaper is not None:
+        upload_reaper.cancel()
+    await reindexer.stop()
+    await job_queue.stop()
+    if model_workers is not None:
+        model_workers.shutdown()
+    speech_executor.shutdown(wait=False)
+    text_executor.shutdown(wait=False)
+    analysis_cache.close()
+    if es_client is not None:
+        await es_client.close()
+
+
+async def warm_up_model_workers() -> None:
+    for name in model_status:
+        model_status[name] = {"state": "loading"}
+    try:
+        durations = await model_workers.warm_up(MODEL_LOAD_ORDER, MODEL_LOAD_CONCURRENCY)
+    except Exception as exc:
+        for name, status in model_status.items():
+            if status["state"] != "ready":
+                model_status[name] = {"state": "failed", "error": str(exc)}
+        raise
+    for name, seconds in durations.items():
+        model_load_seconds.set(seconds, model=name)
+        model_status[name] = {"state": "ready", "loadSeconds": round(seconds, 3)}
+
+
+async def run_warm_up_inference() -> None:
+    warm_up_status["state"] = "running"
+    started = time.perf_counter()
+    silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    await run_speech_pipeline(silence, SAMPLE_RATE)
+    await analyze_text("warm up")
+    warm_up_status.update(state="done", seconds=round(time.perf_counter() - started, 3))
+
+
+def read_startup_record() -> Dict[str, Any] | None:
+    try:
+        return json.loads(STARTUP_RECORD.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def write_startup_record(record: Dict[str, Any]) -> None:
+    STARTUP_RECORD.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STARTUP_RECORD.with_name(f".{STARTUP_RECORD.name}.{secrets.token_hex(4)}.tmp")
+    tmp.write_text(json.dumps(record, indent=2), encoding="utf-8")
+    tmp.replace(STARTUP_RECORD)
+
+
+def models_ready() -> bool:
+    loaded = all(status["state"] == "ready" for status in model_status.values())
+    return loaded and warm_up_status["state"] in ("done", "disabled")
+
+
+async def prepare_models() -> None:
+    try:
+        if model_workers is not None:
+            await warm_up_model_workers()
+        else:
+            getters = {
+                "speech": get_speech_pipeline,
+                "emotion": get_emotion_pipeline,
+                "keyword": get_keyword_model,
+            }
+            await asyncio.gather(*(getters[name]() for name in MODEL_LOAD_ORDER))
+        if WARMUP_ENABLED:
+            await run_warm_up_inference()
+    except Exception as exc:  # noqa: BLE001
+        if warm_up_status["state"] == "running":
+            warm_up_status.update(state="failed", error=str(exc))
+        log.error("Model preparation failed: %s", exc)
+        return
+    ready_seconds = round(time.time() - STARTED_AT, 3)
+    log.info("Models ready %.1fs after start", ready_seconds)
+    record = {
+        "fingerprint": model_fingerprint(),
+        "mode": MODEL_WORKER_MODE,
+        "backend": INFERENCE_BACKEND,
+        "models": {name: status.get("loadSeconds") for name, status in model_status.items()},
+        "warmUpSeconds": warm_up_status.get("seconds"),
+        "readySeconds": ready_seconds,
+        "recordedAt": datetime.utcnow().isoformat(),
+    }
+    await asyncio.to_thread(write_startup_record, record)
 
 
 @app.on_event("startup")
 async def on_startup() -> None:
+    global es_client, upload_reaper
+    asyncio.get_running_loop().set_default_executor(io_executor)
+    if es_client is None:
+        es_client = build_es_client()
     await ensure_index()
-    asyncio.create_task(get_speech_pipeline())
-    asyncio.create_task(get_emotion_pipeline())
-    asyncio.create_task(get_keyword_model())
+    app.state.previous_startup = await asyncio.to_thread(read_startup_record)
+    asyncio.create_task(prepare_models())
+    await job_queue.start()
+    if UPLOAD_REAPER_ENABLED:
+        upload_reaper = asyncio.create_task(upload_reaper_loop())
+    if REINDEX_AUTO_RESUME and reindexer.state and reindexer.state["state"] == "running":
+        log.info("Resuming interrupted reindex into %s", reindexer.state["target"])
+        reindexer.start(es_client)
     log.info("Startup tasks scheduled")
 
 
 @app.get("/api/es-status")
 async def es_status() -> Dict[str, Any]:
     try:
-        info = await asyncio.to_thread(es_client.info)
+        info = await es_client.info()
         name = info.get("cluster_name", "unknown")
         return {"success": True, "message": f"Connecte a {name}"}
     except Exception as exc:
@@ -418,36 +1463,81 @@ async def es_status() -> Dict[str, Any]:
 @app.get("/api/health")
 async def health() -> Dict[str, Any]:
     try:
-        ping = await asyncio.to_thread(es_client.ping)
+        ping = await es_client.ping()
         return {"success": bool(ping), "elastic": bool(ping)}
     except Exception:
         return {"success": False, "elastic": False}
 
 
-@app.post("/api/reindex")
-async def reindex() -> Dict[str, Any]:
+@app.get("/api/ready")
+async def ready(response: Response) -> Dict[str, Any]:
+    is_ready = models_ready()
+    if not is_ready:
+        response.status_code = 503
+    return {
+        "ready": is_ready,
+        "backend": INFERENCE_BACKEND,
+        "models": model_status,
+        "warmUp": warm_up_status,
+        "uptimeSeconds": round(time.time() - STARTED_AT, 3),
+        "previousStartup": getattr(app.state, "previous_startup", None),
+    }
+
+
+@app.post("/api/reindex", status_code=202)
+async def reindex(resume: bool = Query(default=True)) -> Dict[str, Any]:
     await ensure_index()
-    return {"success": True}
+    try:
+        return reindexer.start(es_client, resume=resume)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+
+@app.get("/api/reindex")
+async def reindex_status() -> Dict[str, Any]:
+    return reindexer.status()
 
 
 @app.get("/api/items")
-async def list_items(size: int = Query(50, ge=1)) -> List[Dict[str, Any]]:
+async def list_items(
+    response: Response,
+    size: int = Query(50, ge=1),
+    cursor: str | None = Query(default=None),
+    count: bool = Query(False),
+) -> List[Dict[str, Any]]:
     size = min(size, 200)
-    body = {
-        "index": ES_INDEX,
-        "size": size,
-        "sort": [{"timestamp": {"order": "desc"}}],
-        "query": {"match_all": {}},
-    }
-    resp = await asyncio.to_thread(es_client.search, **body)
-    hits = resp.get("hits", {}).get("hits", [])
-    return [{"id": h.get("_id"), **(h.get("_source") or {})} for h in hits]
+    if cursor is not None:
+        hits, next_cursor, total = await fetch_cursor_page("items", "", size, cursor, count)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        if total is not None:
+            response.headers["X-Total-Count"] = str(total)
+        return [{"id": h.get("_id"), **(h.get("_source") or {})} for h in hits]
+
+    async def load() -> Tuple[int | None, List[Dict[str, Any]]]:
+        body = {
+            "index": ES_INDEX,
+            "size": size,
+            "sort": ITEMS_SORT,
+            "query": {"match_all": {}},
+            "source_excludes": ["transcriptionVector"],
+            "track_total_hits": count,
+        }
+        resp = await es_client.search(**body)
+        total = resp.get("hits", {}).get("total", {}).get("value") if count else None
+        hits = resp.get("hits", {}).get("hits", [])
+        return total, [{"id": h.get("_id"), **(h.get("_source") or {})} for h in hits]
+
+    total, items = await read_cache.get_or_load(("items", size, count), load)
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    return items
 
 
 @app.get("/api/items/{doc_id}")
 async def get_item(doc_id: str) -> Dict[str, Any]:
     try:
-        resp = await asyncio.to_thread(es_client.get, index=ES_INDEX, id=doc_id)
+        resp = await es_client.get(index=ES_INDEX, id=doc_id)
         return {"id": resp.get("_id"), **(resp.get("_source") or {})}
     except NotFoundError:
         raise HTTPException(status_code=404, detail="Not found")
@@ -456,9 +1546,10 @@ async def get_item(doc_id: str) -> Dict[str, Any]:
 @app.put("/api/items/{doc_id}")
 async def update_item(doc_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        await asyncio.to_thread(
-            es_client.update, index=ES_INDEX, id=doc_id, doc=payload, doc_as_upsert=False
-        )
+        async with reindexer.guard_write():
+            await es_client.update(index=ES_INDEX, id=doc_id, doc=payload, doc_as_upsert=False)
+            reindexer.record(doc_id)
+        invalidate_read_cache()
         return {"success": True}
     except NotFoundError:
         raise HTTPException(status_code=404, detail="Not found")
@@ -467,67 +1558,436 @@ async def update_item(doc_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
 @app.delete("/api/items/{doc_id}")
 async def delete_item(doc_id: str) -> Response:
     try:
-        await asyncio.to_thread(es_client.delete, index=ES_INDEX, id=doc_id)
+        async with reindexer.guard_write():
+            await es_client.delete(index=ES_INDEX, id=doc_id)
+            reindexer.record(doc_id, deleted=True)
+        invalidate_read_cache()
         return Response(status_code=204)
     except NotFoundError:
         raise HTTPException(status_code=404, detail="Not found")
 
 
+@app.get("/api/batching/stats")
+async def batching_stats() -> Dict[str, Any]:
+    return {"emotion": emotion_batcher.stats(), "keyword": keyword_batcher.stats()}
+
+
+@app.get("/api/cache/stats")
+async def cache_stats() -> Dict[str, Any]:
+    return {
+        **(await asyncio.to_thread(analysis_cache.stats)),
+        "queryEmbeddings": query_embedding_cache.stats(),
+        "reads": read_cache.stats(),
+        "renditions": renditions.stats() if renditions is not None else None,
+    }
+
+
 @app.post("/api/analyze")
-async def analyze_audio_endpoint(file: UploadFile = File(...)) -> Dict[str, Any]:
+async def analyze_audio_endpoint(
+    response: Response, file: UploadFile = File(...)
+) -> Dict[str, Any]:
     if not file:
         raise HTTPException(status_code=400, detail="No file uploaded")
-    stored = await save_upload(file)
-    media_metadata = await asyncio.to_thread(extract_media_metadata, file.filename, stored)
-    wav_path = None
+    stored, digest = await save_upload(file)
     try:
-        wav_path = await convert_to_wav(stored)
-        transcription = await transcribe_audio(wav_path)
-        analysis = await analyze_text(transcription)
+        result, cache_hit = await run_analysis(stored, digest, file.filename)
     except Exception as exc:
         log.error("Analysis failed: %s", exc)
         raise HTTPException(status_code=500, detail=str(exc))
-    finally:
-        if wav_path and wav_path.exists():
-            wav_path.unlink(missing_ok=True)
+    response.headers["X-Analysis-Cache"] = "hit" if cache_hit else "miss"
+    return result
+
+
+def timed_segments(
+    result: Any, offset: float, timeline: Timeline | None, duration: float
+) -> List[Dict[str, Any]]:
+    chunks = result.get("chunks") if isinstance(result, dict) else None
+    segments = []
+    for item in chunks or []:
+        start, end = item.get("timestamp") or (None, None)
+        start = 0.0 if start is None else float(start)
+        end = duration if end is None else float(end)
+        if timeline is not None:
+            start, end = timeline.to_original(start), timeline.to_original(end)
+        segments.append(
+            {
+                "start": round(offset + start, 3),
+                "end": round(offset + min(end, duration), 3),
+                "text": str(item.get("text", "")).strip(),
+            }
+        )
+    return segments
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_analysis(stored: Path, digest: str, file_name: str | None) -> AsyncIterator[str]:
+    started = time.perf_counter()
+    cached = await asyncio.to_thread(analysis_cache.get, analysis_cache_key(digest))
+    if cached is None:
+        cached = await asyncio.to_thread(analysis_cache.get, analysis_cache_key(digest, True))
+    if cached is not None:
+        media_metadata = {**cached["media"], "trackId": derive_track_id(file_name, stored)}
+        yield sse_event(
+            "result",
+            analysis_result(
+                stored, file_name, cached["transcription"], cached["analysis"], media_metadata
+            ),
+        )
+        return
+    try:
+        media_metadata = await asyncio.to_thread(extract_media_metadata, file_name, stored)
+        texts: List[str] = []
+        offset = 0.0
+        index = 0
+        peaks = PeakBuilder(PEAKS_LEVELS) if PEAKS_LEVELS else None
+        async with aclosing(iter_audio_chunks(stored, STREAM_CHUNK_SECONDS)) as chunks:
+            async for chunk in chunks:
+                duration = chunk.size / SAMPLE_RATE
+                if peaks is not None:
+                    peaks.add(chunk)
+                speech, timeline = chunk, None
+                if VAD_ENABLED:
+                    speech, timeline = await apply_vad(chunk, SAMPLE_RATE)
+                text, segments = "", []
+                if speech.size:
+                    async with stage_slots["transcribe"]:
+                        result = await run_speech_pipeline(
+                            speech, SAMPLE_RATE, return_timestamps=True
+                        )
+                    text = transcription_text(result)
+                    segments = timed_segments(result, offset, timeline, duration)
+                if index == 0:
+                    stream_first_partial.observe(time.perf_counter() - started)
+                texts.append(text)
+                yield sse_event(
+                    "partial",
+                    {
+                        "index": index,
+                        "start": round(offset, 3),
+                        "end": round(offset + duration, 3),
+                        "text": text,
+                        "segments": segments,
+                    },
+                )
+                offset += duration
+                index += 1
+        transcription = " ".join(t for t in texts if t).strip()
+        complete_media_metadata(media_metadata, stored, int(round(offset * SAMPLE_RATE)))
+        if peaks is not None:
+            await asyncio.to_thread(write_peaks, stored, peaks.finish(), SAMPLE_RATE, PEAKS_BITS)
+        async with stage_slots["analyze"]:
+            analysis = await analyze_text(transcription)
+        await store_analysis(digest, transcription, analysis, media_metadata, streamed=True)
+        yield sse_event(
+            "result", analysis_result(stored, file_name, transcription, analysis, media_metadata)
+        )
+    except Exception as exc:  # noqa: BLE001
+        log.error("Streaming analysis failed: %s", exc)
+        yield sse_event("error", {"detail": str(exc)})
+
+
+@app.post("/api/analyze/stream")
+async def analyze_audio_stream(file: UploadFile = File(...)) -> StreamingResponse:
+    if not file:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+    file_name = file.filename
+    stored, digest = await save_upload(file)
+    return StreamingResponse(
+        stream_analysis(stored, digest, file_name),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/pipeline/stats")
+async def pipeline_stats() -> Dict[str, Any]:
+    return {
+        "firstPartialSeconds": stream_first_partial.snapshot(),
+        "vadSkippedRatio": vad_skipped.snapshot(),
+        "stageSeconds": stage_seconds.snapshot(),
+        "executors": {name: pool.stats() for name, pool in executors.items()},
+        "admission": {name: limit.stats() for name, limit in admission.items()},
+    }
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(file: UploadFile = File(...)) -> Dict[str, Any]:
+    if not file:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+    file_name = file.filename
+    stored, digest = await save_upload(file)
+    job = await job_queue.submit(
+        {"storedFileName": stored.name, "digest": digest, "fileName": file_name}
+    )
+    if job is None:
+        raise HTTPException(
+            status_code=429,
+            detail="Job queue is full",
+            headers={"Retry-After": str(admission["jobs"].retry_after())},
+        )
+    return {"jobId": job["id"], "status": job["status"]}
+
+
+def upload_http_error(exc: UploadError) -> HTTPException:
+    headers = {"Upload-Offset": str(exc.offset)} if exc.offset is not None else None
+    return HTTPException(status_code=exc.status_code, detail=exc.detail, headers=headers)
+
+
+def upload_state(session: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "uploadId": session["id"],
+        "fileName": session["fileName"],
+        "size": session["size"],
+        "offset": session["offset"],
+    }
+
+
+def upload_headers(session: Dict[str, Any]) -> Dict[str, str]:
     return {
-        "fileName": file.filename,
+        "Upload-Offset": str(session["offset"]),
+        "Upload-Length": str(session["size"]),
+        "Cache-Control": "no-store",
+    }
+
+
+@app.post("/api/uploads", status_code=201)
+async def create_upload(payload: Dict[str, Any], response: Response) -> Dict[str, Any]:
+    try:
+        size = int(payload.get("size", 0))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="size must be an integer")
+    try:
+        session = await asyncio.to_thread(
+            upload_store.create, payload.get("fileName"), size, payload.get("sha256")
+        )
+    except UploadError as exc:
+        raise upload_http_error(exc)
+    response.headers["Location"] = f"/api/uploads/{session['id']}"
+    response.headers.update(upload_headers(session))
+    return {**upload_state(session), "maxChunkBytes": UPLOAD_CHUNK_MAX_BYTES}
+
+
+@app.api_route("/api/uploads/{upload_id}", methods=["GET", "HEAD"])
+async def get_upload(upload_id: str, request: Request) -> Response:
+    session = await asyncio.to_thread(upload_store.get, upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    if request.method == "HEAD":
+        return Response(status_code=204, headers=upload_headers(session))
+    body = json.dumps(upload_state(session))
+    return Response(body, media_type="application/json", headers=upload_headers(session))
+
+
+@app.patch("/api/uploads/{upload_id}")
+async def append_upload(upload_id: str, request: Request, response: Response) -> Dict[str, Any]:
+    offset = request.headers.get("upload-offset", "")
+    if not offset.isdigit():
+        raise HTTPException(status_code=400, detail="Upload-Offset header is required")
+    try:
+        with stage_seconds.time(stage="upload_write"):
+            session = await upload_store.write_chunk(
+                upload_id,
+                int(offset),
+                request.stream(),
+                request.headers.get("upload-checksum"),
+            )
+    except UploadError as exc:
+        raise upload_http_error(exc)
+    response.headers.update(upload_headers(session))
+    return upload_state(session)
+
+
+@app.post("/api/uploads/{upload_id}/commit")
+async def commit_upload(upload_id: str, analyze: bool = Query(default=False)) -> Dict[str, Any]:
+    try:
+        stored, digest, session = await asyncio.to_thread(upload_store.commit, upload_id)
+    except UploadError as exc:
+        raise upload_http_error(exc)
+    result = {
+        "fileName": session["fileName"],
         "storedFileName": stored.name,
-        "storedPath": f"uploads/{stored.name}",
-        "transcription": transcription,
-        **analysis,
-        **media_metadata,
-        "timestamp": datetime.utcnow().isoformat(),
+        "storedPath": f"uploads/{upload_store.relative(stored)}",
+        "digest": digest,
+        "size": session["size"],
     }
+    if analyze:
+        job = await job_queue.submit(
+            {"storedFileName": stored.name, "digest": digest, "fileName": session["fileName"]}
+        )
+        if job is None:
+            raise HTTPException(
+                status_code=429,
+                detail="Job queue is full",
+                headers={"Retry-After": str(admission["jobs"].retry_after())},
+            )
+        result.update(jobId=job["id"], status=job["status"])
+    return result
+
+
+@app.delete("/api/uploads/{upload_id}", status_code=204)
+async def abort_upload(upload_id: str) -> Response:
+    if not await asyncio.to_thread(upload_store.abort, upload_id):
+        raise HTTPException(status_code=404, detail="Not found")
+    return Response(status_code=204)
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return {k: v for k, v in job.items() if k != "input"}
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str) -> StreamingResponse:
+    if await job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    async def stream():
+        async for job in job_queue.events(job_id):
+            public = {k: v for k, v in job.items() if k != "input"}
+            yield sse_event(job["status"], public)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
 
 
 @app.post("/api/save")
 async def save_analysis(payload: Dict[str, Any]) -> Dict[str, Any]:
-    resp = await asyncio.to_thread(es_client.index, index=ES_INDEX, document=payload)
+    async with reindexer.guard_write():
+        resp = await es_client.index(index=ES_INDEX, document=payload)
+        reindexer.record(resp["_id"])
+    invalidate_read_cache()
     return {"success": True, "id": resp.get("_id")}
 
 
+@app.post("/api/save/bulk")
+async def save_bulk(
+    request: Request,
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=10000),
+    workers: int = Query(BULK_WORKERS, ge=1, le=32),
+) -> Dict[str, Any]:
+    # Bulk lines may update documents by id without the ids coming back,
+    # so a reindex could not replay them.
+    if reindexer.resumable():
+        raise HTTPException(status_code=409, detail="Reindex in progress")
+    try:
+        report = await bulk_ingest(
+            es_client,
+            ES_INDEX,
+            iter_ndjson_lines(request.stream(), BULK_MAX_LINE_BYTES),
+            chunk_size=chunk_size,
+            workers=workers,
+            max_retries=ES_MAX_RETRIES,
+            max_errors=BULK_MAX_ERRORS,
+        )
+    except LineTooLong as exc:
+        # Lines before the rejected one may already be indexed.
+        if exc.report["indexed"]:
+            invalidate_read_cache()
+        raise HTTPException(status_code=413, detail={"error": str(exc), **exc.report})
+    if report["indexed"]:
+        invalidate_read_cache()
+    return report
+
+
+@app.get("/api/export")
+async def export_items(vectors: bool = Query(True)) -> StreamingResponse:
+    excludes = () if vectors else ("transcriptionVector",)
+    return StreamingResponse(
+        export_ndjson(es_client, ES_INDEX, EXPORT_PAGE_SIZE, PIT_KEEP_ALIVE, excludes),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{ES_INDEX}.ndjson"'},
+    )
+
+
 @app.get("/api/search")
 async def search(
     response: Response,
     q: str | None = Query(default=None),
     size: int = Query(25, ge=1),
     offset: int = Query(0, ge=0, alias="from"),
+    cursor: str | None = Query(default=None),
+    count: bool = Query(True),
 ) -> List[Dict[str, Any]]:
     size = min(size, 200)
-    es_query = {"match_all": {}}
-    if q:
-        es_query = {
-            "multi_match": {
-                "query": q,
-                "fields": ["transcription", "primaryEmotions", "title", "keywords"],
-            }
+    normalized = " ".join((q or "").split())
+    if cursor is not None:
+        hits, next_cursor, total = await fetch_cursor_page(
+            "search", normalized, size, cursor, count
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        if total is not None:
+            response.headers["X-Total-Count"] = str(total)
+        return [
+            {"id": hit.get("_id"), "score": hit.get("_score"), **(hit.get("_source") or {})}
+            for hit in hits
+        ]
+
+    async def load() -> Tuple[int | None, List[Dict[str, Any]]]:
+        resp = await es_client.search(
+            index=ES_INDEX,
+            size=size,
+            from_=offset,
+            query=build_text_query(normalized),
+            source_excludes=["transcriptionVector"],
+            track_total_hits=count,
+        )
+        total = resp.get("hits", {}).get("total", {}).get("value", 0) if count else None
+        hits = resp.get("hits", {}).get("hits", [])
+        return total, [
+            {"id": hit.get("_id"), "score": hit.get("_score"), **(hit.get("_source") or {})}
+            for hit in hits
+        ]
+
+    total, items = await read_cache.get_or_load(
+        ("search", normalized, size, offset, count), load
+    )
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    return items
+
+
+@app.get("/api/search/semantic")
+async def semantic_search(
+    q: str = Query(..., min_length=1),
+    mode: str = Query("knn", pattern="^(knn|hybrid)$"),
+    size: int = Query(25, ge=1),
+    num_candidates: int | None = Query(default=None, ge=1),
+    alpha: float = Query(0.5, ge=0, le=1),
+) -> List[Dict[str, Any]]:
+    size = min(size, 200)
+    candidates = num_candidates or size * KNN_CANDIDATE_FACTOR
+    candidates = min(max(candidates, size), KNN_MAX_CANDIDATES)
+    vector = await embed_query(q)
+    knn = {
+        "field": "transcriptionVector",
+        "query_vector": vector,
+        "k": size,
+        "num_candidates": candidates,
+    }
+    params: Dict[str, Any] = {}
+    if mode == "hybrid":
+        knn["boost"] = alpha
+        params["query"] = {
+            "multi_match": {"query": q, "fields": SEARCH_FIELDS, "boost": 1 - alpha}
         }
-    resp = await asyncio.to_thread(
-        es_client.search, index=ES_INDEX, size=size, from_=offset, query=es_query
+    resp = await es_client.search(
+        index=ES_INDEX,
+        size=size,
+        knn=knn,
+        source_excludes=["transcriptionVector"],
+        **params,
     )
-    total = resp.get("hits", {}).get("total", {}).get("value", 0)
-    response.headers["X-Total-Count"] = str(total)
     hits = resp.get("hits", {}).get("hits", [])
     return [
         {"id": hit.get("_id"), "score": hit.get("_score"), **(hit.get("_source") or {})}
@@ -537,9 +1997,12 @@ async def search(
 
 @app.get("/api/stats")
 async def stats() -> Dict[str, Any]:
+    return await read_cache.get_or_load(("stats",), load_stats)
+
+
+async def load_stats() -> Dict[str, Any]:
     try:
-        resp = await asyncio.to_thread(
-            es_client.search,
+        resp = await es_client.search(
             index=ES_INDEX,
             size=0,
             aggs={
@@ -567,53 +2030,81 @@ def validate_filename(name: str) -> None:
         raise HTTPException(status_code=400, detail="Invalid filename")
 
 
-def slice_file(path: Path, start: int, end: int):
-    with path.open("rb") as stream:
-        stream.seek(start)
-        remaining = end - start + 1
-        while remaining > 0:
-            chunk = stream.read(min(1024 * 64, remaining))
-            if not chunk:
-                break
-            remaining -= len(chunk)
-            yield chunk
+@app.api_route("/api/audio/{filename}", methods=["GET", "HEAD"])
+async def audio(
+    filename: str,
+    request: Request,
+    rendition: str | None = Query(default=None, pattern="^(opus|aac|original)$"),
+) -> Response:
+    validate_filename(filename)
+    source = upload_store.resolve(filename)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    if renditions is not None and rendition != "original":
+        fmt = renditions.negotiate(rendition, request.headers.get("accept"))
+        path = renditions.lookup(filename, fmt) if fmt else None
+        if path is not None:
+            info = await get_file_info(path, FORMATS[fmt]["media_type"])
+            if info is not None:
+                return serve_file(request, info, {"Vary": "Accept"})
+        if fmt:
+            renditions.schedule(filename, source)
+    info = await get_file_info(source)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return serve_file(request, info, {"Vary": "Accept"} if renditions is not None else None)
 
 
-def stream_file(path: Path):
-    with path.open("rb") as stream:
-        while chunk := stream.read(1024 * 64):
-            yield chunk
+@app.get("/api/audio/{filename}/peaks")
+async def audio_peaks(
+    filename: str,
+    request: Request,
+    width: int | None = Query(default=None, ge=1, le=100000),
+    samples_per_pixel: int | None = Query(default=None, alias="samplesPerPixel"),
+) -> Response:
+    validate_filename(filename)
+    if not PEAKS_LEVELS:
+        raise HTTPException(status_code=404, detail="Peaks are disabled")
+    if samples_per_pixel is not None and samples_per_pixel not in PEAKS_LEVELS:
+        raise HTTPException(
+            status_code=400, detail=f"samplesPerPixel must be one of {PEAKS_LEVELS}"
+        )
+    source = upload_store.resolve(filename)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    finest = level_path(source, PEAKS_LEVELS[0])
+    points = await asyncio.to_thread(read_length, finest)
+    if points is None:
+        try:
+            await ensure_peaks(source)
+        except Exception as exc:  # noqa: BLE001
+            log.error("Peak computation failed for %s: %s", filename, exc)
+            raise HTTPException(status_code=500, detail="Could not compute peaks")
+        points = await asyncio.to_thread(read_length, finest) or 0
+    level = samples_per_pixel or pick_level(PEAKS_LEVELS, points, width)
+    info = await get_file_info(level_path(source, level), PEAKS_MEDIA_TYPE)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return serve_file(request, info, {"X-Samples-Per-Pixel": str(level)})
 
 
-@app.get("/api/audio/{filename}")
-async def audio(filename: str, request: Request) -> StreamingResponse:
+@app.get("/api/audio/{filename}/hls/{asset}")
+async def audio_hls(filename: str, asset: str, request: Request) -> Response:
     validate_filename(filename)
-    file_path = UPLOAD_DIR / filename
-    if not file_path.exists():
+    validate_filename(asset)
+    if renditions is None:
+        raise HTTPException(status_code=404, detail="Renditions are disabled")
+    media_type = HLS_MEDIA_TYPES.get(Path(asset).suffix)
+    path = renditions.lookup_hls(filename, asset) if media_type else None
+    if path is None:
+        source = upload_store.resolve(filename)
+        if source is not None:
+            renditions.schedule(filename, source)
         raise HTTPException(status_code=404, detail="Not found")
-    file_size = file_path.stat().st_size
-    range_header = request.headers.get("range")
-    media_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
-    if range_header and range_header.startswith("bytes="):
-        start_str, _, end_str = range_header.replace("bytes=", "").partition("-")
-        start = int(start_str or 0)
-        end = int(end_str) if end_str else file_size - 1
-        if start >= file_size or end >= file_size or start > end:
-            headers = {"Content-Range": f"bytes */{file_size}"}
-            return StreamingResponse(iter(()), status_code=416, headers=headers)
-        headers = {
-            "Content-Range": f"bytes {start}-{end}/{file_size}",
-            "Accept-Ranges": "bytes",
-            "Content-Length": str(end - start + 1),
-        }
-        return StreamingResponse(
-            slice_file(file_path, start, end),
-            status_code=206,
-            media_type=media_type,
-            headers=headers,
-        )
-    headers = {"Content-Length": str(file_size), "Accept-Ranges": "bytes"}
-    return StreamingResponse(stream_file(file_path), media_type=media_type, headers=headers)
+    info = await get_file_info(path, media_type)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return serve_file(request, info)
 
 
 if __name__ == "__main__":
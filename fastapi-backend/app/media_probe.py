@@ -0,0 +1,266 @@
+import os
+import struct
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Tuple
+
+from .memo import LRUCache
+
+Probe = Dict[str, Any]
+
+MP3_BITRATES = {
+    # (MPEG-1?, layer) -> kbps by index
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+MP3_SYNC_SCAN = 64 * 1024
+# Plausible average bitrates for a VBR header's frame count; anything outside
+# means the header is corrupt and the CBR estimate is used instead.
+MP3_VBR_KBPS_RANGE = (8, 448)
+OGG_TAIL_SCAN = 64 * 1024
+MP4_CONTAINERS = {b"moov", b"trak", b"mdia"}
+
+probe_cache = LRUCache(int(os.getenv("MEDIA_PROBE_CACHE_SIZE", "4096")))
+
+
+def file_identity(path: Path) -> Tuple[int, int, int, int]:
+    st = path.stat()
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _result(duration: float, bits: float) -> Probe | None:
+    if duration <= 0:
+        return None
+    return {"duration": round(duration, 3), "bitRate": int(round(bits / duration / 1000))}
+
+
+def _probe_wav(handle: BinaryIO, size: int) -> Probe | None:
+    header = handle.read(12)
+    if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+    byte_rate = None
+    while True:
+        chunk = handle.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, chunk_size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+        if chunk_id == b"fmt ":
+            fmt = handle.read(chunk_size + chunk_size % 2)
+            byte_rate = struct.unpack_from("<I", fmt, 8)[0]
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            # Streamed WAVs leave the size as 0 or 0xFFFFFFFF; use the file size.
+            data_size = min(chunk_size, size - handle.tell()) or size - handle.tell()
+            return _result(data_size / byte_rate, data_size * 8)
+        else:
+            handle.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+def _probe_flac(handle: BinaryIO, size: int) -> Probe | None:
+    if handle.read(4) != b"fLaC":
+        return None
+    block = handle.read(4)
+    if len(block) < 4 or block[0] & 0x7F != 0:
+        return None
+    info = handle.read(34)
+    if len(info) < 34:
+        return None
+    packed = int.from_bytes(info[10:18], "big")
+    sample_rate = packed >> 44
+    total_samples = packed & ((1 << 36) - 1)
+    if not sample_rate or not total_samples:
+        return None
+    return _result(total_samples / sample_rate, size * 8)
+
+
+def _skip_id3(handle: BinaryIO) -> int:
+    header = handle.read(10)
+    if header[:3] != b"ID3" or len(header) < 10:
+        return 0
+    tag_size = 0
+    for byte in header[6:10]:
+        tag_size = (tag_size << 7) | (byte & 0x7F)
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + tag_size + footer
+
+
+def _mp3_frame(header: bytes) -> Tuple[bool, int, int, int, int, bool] | None:
+    """Decode a frame header into (mpeg1, layer, kbps, sample rate, frame bytes, mono)."""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 0x3
+    layer_bits = (header[1] >> 1) & 0x3
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version_bits == 3
+    layer = 4 - layer_bits
+    kbps = MP3_BITRATES[(mpeg1, layer)][bitrate_index]
+    sample_rate = MP3_SAMPLE_RATES[version_bits][rate_index]
+    padding = (header[2] >> 1) & 0x1
+    if layer == 1:
+        length = (12 * kbps * 1000 // sample_rate + padding) * 4
+    else:
+        coefficient = 144 if mpeg1 or layer == 2 else 72
+        length = coefficient * kbps * 1000 // sample_rate + padding
+    return mpeg1, layer, kbps, sample_rate, length, (header[3] >> 6) == 3
+
+
+def _probe_mp3(handle: BinaryIO, size: int) -> Probe | None:
+    start = _skip_id3(handle)
+    handle.seek(start)
+    window = handle.read(MP3_SYNC_SCAN)
+    offset = 0
+    while True:
+        offset = window.find(b"\xff", offset)
+        if offset < 0 or offset + 4 > len(window):
+            return None
+        frame_info = _mp3_frame(window[offset : offset + 4])
+        # Require a second frame header right after this one so stray 0xFF
+        # bytes in other formats are not mistaken for MPEG audio.
+        if frame_info is not None:
+            following = window[offset + frame_info[4] : offset + frame_info[4] + 4]
+            if len(following) < 4 or _mp3_frame(following) is not None:
+                break
+        offset += 1
+    mpeg1, layer, kbps, sample_rate, _, mono = frame_info
+    samples_per_frame = 384 if layer == 1 else 1152 if mpeg1 or layer == 2 else 576
+    audio_start = start + offset
+    audio_bytes = size - audio_start
+    handle.seek(size - 128)
+    if handle.read(3) == b"TAG":
+        audio_bytes -= 128
+
+    frame = window[offset:]
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    xing = frame[4 + side_info : 4 + side_info + 16]
+    vbri = frame[36:54]
+    frames = 0
+    if xing[:4] in (b"Xing", b"Info") and struct.unpack(">I", xing[4:8])[0] & 0x1:
+        frames = struct.unpack(">I", xing[8:12])[0]
+    elif vbri[:4] == b"VBRI" and len(vbri) == 18:
+        # VBRI: id, version, delay, quality, byte count, then frame count.
+        frames = struct.unpack(">I", vbri[14:18])[0]
+    if frames:
+        duration = frames * samples_per_frame / sample_rate
+        low, high = MP3_VBR_KBPS_RANGE
+        if low <= audio_bytes * 8 / duration / 1000 <= high:
+            return _result(duration, audio_bytes * 8)
+    return _result(audio_bytes * 8 / (kbps * 1000), audio_bytes * 8)
+
+
+def _probe_ogg(handle: BinaryIO, size: int) -> Probe | None:
+    page = handle.read(27)
+    if page[:4] != b"OggS":
+        return None
+    segments = handle.read(page[26])
+    packet = handle.read(min(sum(segments), 64))
+    if packet[:7] == b"\x01vorbis":
+        sample_rate, pre_skip = struct.unpack_from("<I", packet, 12)[0], 0
+    elif packet[:8] == b"OpusHead":
+        sample_rate, pre_skip = 48000, struct.unpack_from("<H", packet, 10)[0]
+    elif packet[:5] == b"\x7fFLAC":
+        # Mapping header (9 bytes), "fLaC", a metadata block header, then
+        # STREAMINFO at offset 17 with the rate and sample count at +10.
+        packed = int.from_bytes(packet[27:35], "big")
+        sample_rate, pre_skip = packed >> 44, 0
+        total_samples = packed & ((1 << 36) - 1)
+        if sample_rate and total_samples:
+            return _result(total_samples / sample_rate, size * 8)
+    else:
+        return None
+    if not sample_rate:
+        return None
+    tail_start = max(0, size - OGG_TAIL_SCAN)
+    handle.seek(tail_start)
+    tail = handle.read()
+    last = tail.rfind(b"OggS")
+    if last < 0 or last + 14 > len(tail):
+        return None
+    granule = struct.unpack_from("<q", tail, last + 6)[0]
+    return _result((granule - pre_skip) / sample_rate, size * 8)
+
+
+def _iter_boxes(handle: BinaryIO, start: int, end: int):
+    position = start
+    while position + 8 <= end:
+        handle.seek(position)
+        header = handle.read(8)
+        if len(header) < 8:
+            return
+        box_size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if box_size == 1:
+            box_size = struct.unpack(">Q", handle.read(8))[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = end - position
+        if box_size < header_size:
+            return
+        yield box_type, position + header_size, position + box_size
+        position += box_size
+
+
+def _find_mvhd(handle: BinaryIO, start: int, end: int) -> Tuple[int, int] | None:
+    for box_type, body, box_end in _iter_boxes(handle, start, end):
+        if box_type == b"mvhd":
+            handle.seek(body)
+            data = handle.read(32)
+            if data[0] == 1:
+                timescale, duration = struct.unpack_from(">IQ", data, 20)
+            else:
+                timescale, duration = struct.unpack_from(">II", data, 12)
+            return timescale, duration
+        if box_type in MP4_CONTAINERS:
+            found = _find_mvhd(handle, body, box_end)
+            if found:
+                return found
+    return None
+
+
+def _probe_mp4(handle: BinaryIO, size: int) -> Probe | None:
+    if handle.read(8)[4:8] != b"ftyp":
+        return None
+    found = _find_mvhd(handle, 0, size)
+    if not found or not found[0]:
+        return None
+    timescale, duration = found
+    return _result(duration / timescale, size * 8)
+
+
+PROBES = (_probe_wav, _probe_flac, _probe_ogg, _probe_mp4, _probe_mp3)
+
+
+def read_header(path: Path) -> Probe | None:
+    """Read duration and bitrate from the container header, without decoding."""
+    size = path.stat().st_size
+    with path.open("rb") as handle:
+        for probe in PROBES:
+            handle.seek(0)
+            try:
+                result = probe(handle, size)
+            except (struct.error, IndexError, KeyError, ZeroDivisionError, OSError):
+                result = None
+            if result is not None:
+                return result
+    return None
+
+
+def probe_media(path: Path) -> Probe | None:
+    """Memoized ``read_header``; a miss is cached too, so the caller decodes instead."""
+    key = file_identity(path)
+    cached = probe_cache.get(key)
+    if cached is None:
+        cached = read_header(path) or {}
+        probe_cache.set(key, cached)
+    return cached or None
+
+
+def remember_probe(path: Path, probe: Probe) -> None:
+    probe_cache.set(file_identity(path), probe)
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, max_entries: int, ttl: float | None = None) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires, value = entry
+                if self.ttl is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl is not None else 0.0
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._data),
+            "maxEntries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class ResultCache:
+    """TTL/LRU cache for read endpoints with generation-based invalidation.
+
+    Keys are scoped to the current generation, so ``invalidate`` drops every
+    cached entry at once. Concurrent misses on the same key share one load.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self._cache = LRUCache(max_entries, ttl)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.generation = 0
+        self.coalesced = 0
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self._cache.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            generation = self.generation
+            scoped = (generation, key)
+            value = self._cache.get(scoped, _MISSING)
+            if value is not _MISSING:
+                return value
+            pending = self._inflight.get(scoped)
+            if pending is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The leading request went away, not this one: load again,
+                # leading this time unless another waiter got there first.
+                if not pending.cancelled():
+                    raise
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[scoped] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(scoped, None)
+        if generation == self.generation:
+            self._cache.set(scoped, value)
+        future.set_result(value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._cache.stats(),
+            "generation": self.generation,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,231 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+RATIO_BUCKETS = (0.0, 0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]) -> None:
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = 0
+        buckets: Dict[str, int] = {}
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = count
+        return {"count": count, "sum": round(total, 6), "buckets": buckets}
+
+    def samples(
+        self, name: str, label_names: Sequence[str] = (), label_values: Sequence[str] = ()
+    ) -> List[str]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = _labels(label_names, label_values, f'le="{bound}"')
+            lines.append(f"{name}_bucket{le} {cumulative}")
+        le = _labels(label_names, label_values, 'le="+Inf"')
+        lines.append(f"{name}_bucket{le} {count}")
+        labels = _labels(label_names, label_values)
+        lines.append(f"{name}_sum{labels} {_number(total)}")
+        lines.append(f"{name}_count{labels} {count}")
+        return lines
+
+    def render(self, prefix: str = "") -> List[str]:
+        name = prefix + self.name
+        return [f"# HELP {name} {self.help}", f"# TYPE {name} histogram", *self.samples(name)]
+
+
+class HistogramFamily:
+    """Histograms sharing a name, one child per combination of label values."""
+
+    def __init__(
+        self, name: str, help_text: str, label_names: Sequence[str], buckets: Sequence[float]
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._children: Dict[LabelValues, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: str) -> Histogram:
+        key = tuple(str(labels[name]) for name in self.label_names)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(
+                    key, Histogram(self.name, self.help, self.buckets)
+                )
+        return child
+
+    def time(self, **labels: str):
+        return self.labels(**labels).time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "/".join(key): child.snapshot() for key, child in sorted(self._children.items())
+        }
+
+    def render(self, prefix: str = "") -> List[str]:
+        name = prefix + self.name
+        lines = [f"# HELP {name} {self.help}", f"# TYPE {name} histogram"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.samples(name, self.label_names, key))
+        return lines
+
+
+def _read_fn(fn: Callable[[], Any]) -> Dict[LabelValues, float]:
+    current = fn()
+    if isinstance(current, dict):
+        return {key if isinstance(key, tuple) else (key,): value for key, value in current.items()}
+    return {(): current}
+
+
+class Counter:
+    """A counter incremented in-process, or read from ``fn`` at scrape time (see Gauge)."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        fn: Callable[[], Any] | None = None,
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.fn = fn
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.label_names), 0.0)
+
+    def render(self, prefix: str = "") -> List[str]:
+        name = prefix + self.name
+        lines = [f"# HELP {name} {self.help}", f"# TYPE {name} counter"]
+        values = _read_fn(self.fn) if self.fn is not None else dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{name}{_labels(self.label_names, key)} {_number(value)}")
+        return lines
+
+
+class Gauge:
+    """A settable gauge, or one read from ``fn`` at scrape time.
+
+    ``fn`` returns a number, or a mapping of label-value tuples to numbers
+    when the gauge has labels.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        fn: Callable[[], Any] | None = None,
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.fn = fn
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def values(self) -> Dict[LabelValues, float]:
+        if self.fn is None:
+            return dict(self._values)
+        return _read_fn(self.fn)
+
+    def render(self, prefix: str = "") -> List[str]:
+        name = prefix + self.name
+        lines = [f"# HELP {name} {self.help}", f"# TYPE {name} gauge"]
+        for key, value in sorted(self.values().items()):
+            lines.append(f"{name}{_labels(self.label_names, key)} {_number(value)}")
+        return lines
+
+
+class Registry:
+    """Render registered metrics in the Prometheus text exposition format."""
+
+    def __init__(self, prefix: str = "") -> None:
+        self.prefix = prefix
+        self._metrics: List[Any] = []
+
+    def register(self, metric: Any) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render(self.prefix))
+        return "\n".join(lines) + "\n"
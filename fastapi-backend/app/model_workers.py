@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from .inference_backends import SPEECH_TASK, TEXT_TASK, BackendConfig, build_pipeline
+
+log = logging.getLogger("audio_service.model_workers")
+
+# Populated once per worker process by the pool initializers.
+_models: Dict[str, Any] = {}
+
+
+def _limit_threads(threads: int) -> None:
+    if threads > 0:
+        import torch
+
+        torch.set_num_threads(threads)
+
+
+def _init_speech(model_name: str, threads: int, backend: BackendConfig) -> None:
+    _limit_threads(threads)
+    _models["speech"] = build_pipeline(SPEECH_TASK, model_name, backend)
+
+
+def _init_emotion(model_name: str, threads: int, backend: BackendConfig) -> None:
+    _limit_threads(threads)
+    _models["emotion"] = build_pipeline(TEXT_TASK, model_name, backend)
+
+
+def _init_keyword(model_name: str, threads: int) -> None:
+    from keybert import KeyBERT
+
+    _limit_threads(threads)
+    _models["keyword"] = KeyBERT(model_name)
+
+
+def ready(name: str, barrier: Any = None) -> bool:
+    # Holding every task at the barrier keeps one worker busy per task, so
+    # the pool has to start all of its processes to get past it.
+    if barrier is not None:
+        barrier.wait()
+    return name in _models
+
+
+def transcribe_shared(
+    shm_name: str, length: int, sample_rate: int, kwargs: Dict[str, Any]
+) -> Any:
+    shm = SharedMemory(name=shm_name)
+    try:
+        audio = np.ndarray((length,), dtype=np.float32, buffer=shm.buf)
+        result = _models["speech"]({"array": audio, "sampling_rate": sample_rate}, **kwargs)
+        del audio
+        return result
+    finally:
+        shm.close()
+
+
+def classify_batch(texts: List[str], top_k: int) -> List[Any]:
+    classifier = _models["emotion"]
+    id2label = getattr(classifier.model.config, "id2label", {}) or {}
+    outputs = classifier(texts, top_k=top_k, batch_size=len(texts), truncation=True)
+    resolved = []
+    for rows in outputs:
+        rows = rows if isinstance(rows, list) else [rows]
+        labelled = []
+        for row in rows:
+            label = str(row.get("label", ""))
+            suffix = label.split("_", 1)[-1]
+            if label.lower().startswith("label_") and suffix.isdigit():
+                label = str(id2label.get(int(suffix), label))
+            labelled.append({"label": label, "score": float(row.get("score", 0))})
+        resolved.append(labelled)
+    return resolved
+
+
+def keyword_batch(texts: List[str], top_n: int) -> List[Any]:
+    model = _models["keyword"]
+    embeddings = model.model.embed(texts)
+    pairs = model.extract_keywords(texts, top_n=top_n, doc_embeddings=embeddings)
+    pairs = [pairs] if len(texts) == 1 else list(pairs)
+    return [(keywords, vector.tolist()) for keywords, vector in zip(pairs, embeddings)]
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    return _models["keyword"].model.embed(texts).tolist()
+
+
+class ModelWorkerPool:
+    """Process pools that each host one model, fed through shared memory.
+
+    Decoded audio is copied once into a shared-memory block and only its name
+    crosses the process boundary, so large arrays are never pickled.
+    """
+
+    def __init__(
+        self,
+        speech_model: str,
+        emotion_model: str,
+        keyword_model: str,
+        speech_processes: int,
+        emotion_processes: int,
+        keyword_processes: int,
+        threads_per_process: int,
+        backend: BackendConfig = BackendConfig(),
+    ) -> None:
+        context = multiprocessing.get_context("spawn")
+        self._context = context
+        self._processes = {
+            "speech": max(1, speech_processes),
+            "emotion": max(1, emotion_processes),
+            "keyword": max(1, keyword_processes),
+        }
+        self.speech = ProcessPoolExecutor(
+            max(1, speech_processes),
+            mp_context=context,
+            initializer=_init_speech,
+            initargs=(speech_model, threads_per_process, backend),
+        )
+        self.emotion = ProcessPoolExecutor(
+            max(1, emotion_processes),
+            mp_context=context,
+            initializer=_init_emotion,
+            initargs=(emotion_model, threads_per_process, backend),
+        )
+        self.keyword = ProcessPoolExecutor(
+            max(1, keyword_processes),
+            mp_context=context,
+            initializer=_init_keyword,
+            initargs=(keyword_model, threads_per_process),
+        )
+
+    async def warm_up(self, order: Sequence[str], concurrency: int = 1) -> Dict[str, float]:
+        """Load each pool's model, at most ``concurrency`` pools at a time in ``order``.
+
+        Every process of a pool is started and has its model loaded before
+        the pool counts as ready. Returns the seconds each pool took.
+        """
+        loop = asyncio.get_running_loop()
+        pools = {"speech": self.speech, "emotion": self.emotion, "keyword": self.keyword}
+        slots = asyncio.Semaphore(max(1, concurrency))
+        manager = await asyncio.to_thread(self._context.Manager)
+
+        async def wait(name: str) -> float:
+            async with slots:
+                started = time.perf_counter()
+                count = self._processes[name]
+                barrier = manager.Barrier(count)
+                await asyncio.gather(
+                    *(loop.run_in_executor(pools[name], ready, name, barrier) for _ in range(count))
+                )
+                return time.perf_counter() - started
+
+        names = [*order, *(name for name in pools if name not in order)]
+        try:
+            durations = await asyncio.gather(*(wait(name) for name in names))
+        finally:
+            manager.shutdown()
+        log.info("Model worker processes ready")
+        return dict(zip(names, durations))
+
+    async def transcribe(self, audio: np.ndarray, sample_rate: int, **kwargs: Any) -> Any:
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        shm = SharedMemory(create=True, size=max(1, audio.nbytes))
+        try:
+            shared = np.ndarray(audio.shape, dtype=np.float32, buffer=shm.buf)
+            shared[:] = audio
+            del shared
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.speech, transcribe_shared, shm.name, audio.size, sample_rate, kwargs
+            )
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def shutdown(self) -> None:
+        for pool in (self.speech, self.emotion, self.keyword):
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,129 @@
+import os
+import secrets
+import shutil
+import struct
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+PEAKS_SUFFIX = ".peaks"
+MEDIA_TYPE = "application/vnd.audiowaveform.dat"
+# audiowaveform "dat" version 1 header: version, flags, sample rate,
+# samples per pixel, length. Flag bit 0 set means 8-bit samples.
+HEADER = struct.Struct("<iIiiI")
+FORMAT_VERSION = 1
+
+Levels = Dict[int, Tuple[np.ndarray, np.ndarray]]
+
+
+def peaks_dir(stored: Path) -> Path:
+    return stored.with_name(stored.name + PEAKS_SUFFIX)
+
+
+def level_path(stored: Path, samples_per_pixel: int) -> Path:
+    return peaks_dir(stored) / f"{samples_per_pixel}.dat"
+
+
+def remove_peaks(stored: Path) -> None:
+    shutil.rmtree(peaks_dir(stored), ignore_errors=True)
+
+
+def parse_levels(spec: str) -> List[int]:
+    """Sorted samples-per-pixel levels, keeping only multiples of the finest."""
+    levels = sorted({int(part) for part in spec.split(",") if part.strip().isdigit()} - {0})
+    if not levels:
+        return []
+    return [level for level in levels if level % levels[0] == 0]
+
+
+class PeakBuilder:
+    """Accumulate min/max peaks from PCM chunks of any length.
+
+    Only the finest level is reduced from samples; coarser levels are reduced
+    from it, so the audio is walked once however many levels are kept.
+    """
+
+    def __init__(self, levels: Sequence[int]) -> None:
+        self.levels = list(levels)
+        self.finest = self.levels[0]
+        self._mins: List[np.ndarray] = []
+        self._maxs: List[np.ndarray] = []
+        self._carry = np.empty(0, dtype=np.float32)
+
+    def add(self, samples: np.ndarray) -> None:
+        if self._carry.size:
+            samples = np.concatenate((self._carry, samples))
+        whole = samples.size - samples.size % self.finest
+        if whole:
+            frames = samples[:whole].reshape(-1, self.finest)
+            self._mins.append(frames.min(axis=1))
+            self._maxs.append(frames.max(axis=1))
+        self._carry = samples[whole:].copy()
+
+    def finish(self) -> Levels:
+        if self._carry.size:
+            self._mins.append(self._carry.min(keepdims=True))
+            self._maxs.append(self._carry.max(keepdims=True))
+            self._carry = np.empty(0, dtype=np.float32)
+        mins = np.concatenate(self._mins) if self._mins else np.zeros(0, dtype=np.float32)
+        maxs = np.concatenate(self._maxs) if self._maxs else np.zeros(0, dtype=np.float32)
+        result: Levels = {}
+        for level in self.levels:
+            factor = level // self.finest
+            if factor == 1 or not mins.size:
+                result[level] = (mins, maxs)
+                continue
+            starts = np.arange(0, mins.size, factor)
+            result[level] = (np.minimum.reduceat(mins, starts), np.maximum.reduceat(maxs, starts))
+        return result
+
+
+def encode_level(
+    mins: np.ndarray, maxs: np.ndarray, sample_rate: int, samples_per_pixel: int, bits: int
+) -> bytes:
+    dtype, scale = ("<i1", 127) if bits == 8 else ("<i2", 32767)
+    pairs = np.empty(mins.size * 2, dtype=np.float32)
+    pairs[0::2] = mins
+    pairs[1::2] = maxs
+    quantized = np.clip(np.rint(pairs * scale), -scale - 1, scale).astype(dtype)
+    header = HEADER.pack(
+        FORMAT_VERSION, 1 if bits == 8 else 0, sample_rate, samples_per_pixel, mins.size
+    )
+    return header + quantized.tobytes()
+
+
+def write_peaks(stored: Path, levels: Levels, sample_rate: int, bits: int) -> None:
+    target = peaks_dir(stored)
+    staging = target.with_name(f".{target.name}.{secrets.token_hex(4)}.tmp")
+    staging.mkdir(parents=True)
+    try:
+        for samples_per_pixel, (mins, maxs) in levels.items():
+            data = encode_level(mins, maxs, sample_rate, samples_per_pixel, bits)
+            (staging / f"{samples_per_pixel}.dat").write_bytes(data)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def read_length(path: Path) -> int | None:
+    try:
+        with path.open("rb") as handle:
+            header = handle.read(HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < HEADER.size:
+        return None
+    return HEADER.unpack(header)[4]
+
+
+def pick_level(levels: Sequence[int], finest_points: int, width: int | None) -> int:
+    """Coarsest level still giving at least ``width`` points, else the finest."""
+    if not width:
+        return levels[-1]
+    for level in reversed(levels):
+        if -(-finest_points * levels[0] // level) >= width:
+            return level
+    return levels[0]
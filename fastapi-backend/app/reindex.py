@@ -0,0 +1,434 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Sequence, Tuple
+
+from elasticsearch import AsyncElasticsearch, NotFoundError
+
+log = logging.getLogger("audio_service.reindex")
+
+StoredFiles = Iterator[Tuple[str, List[Tuple[str, Path]]]]
+Analyzer = Callable[[str, Path], Awaitable[Dict[str, Any]]]
+
+TERMS_PAGE = 10000
+REPLAY_BATCH = 1000
+COPY_POLL_SECONDS = 2.0
+RECORD_FLUSH_SECONDS = 1.0
+
+
+def versioned_name(alias: str) -> str:
+    return f"{alias}_{datetime.utcnow():%Y%m%d%H%M%S}"
+
+
+async def resolve_alias(client: AsyncElasticsearch, alias: str) -> Tuple[str | None, bool]:
+    """Return the index currently answering to ``alias`` and whether it is a real alias."""
+    try:
+        indices = await client.indices.get_alias(name=alias)
+        return next(iter(indices)), True
+    except NotFoundError:
+        pass
+    if await client.indices.exists(index=alias):
+        return alias, False
+    return None, False
+
+
+class Reindexer:
+    """Re-analyse stored uploads into a fresh versioned index, then move the alias.
+
+    The job copies the live index into the new one server side, walks the
+    upload store shard by shard merging fresh analysis into every document
+    that references a file, and swaps the alias in one ``update_aliases``
+    call. Writes to the live index go through ``guard_write`` and are
+    recorded with ``record``; before the swap, new documents are copied over
+    and recorded updates and deletes are replayed, the last round with
+    writes held so nothing lands in the old index afterwards. Progress and
+    recorded writes are checkpointed so a restarted job skips the shards it
+    already finished.
+    """
+
+    def __init__(
+        self,
+        checkpoint: Path,
+        alias: str,
+        definition: Callable[[], Dict[str, Any]],
+        stored_files: Callable[[], StoredFiles],
+        analyze: Analyzer,
+        concurrency: int,
+        batch_size: int,
+        preserve: Sequence[str] = (),
+        on_swap: Callable[[], None] | None = None,
+    ) -> None:
+        self.checkpoint = checkpoint
+        self.alias = alias
+        self.definition = definition
+        self.stored_files = stored_files
+        self.analyze = analyze
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.preserve = tuple(preserve)
+        self.on_swap = on_swap
+        self.state: Dict[str, Any] | None = self._load()
+        self._task: asyncio.Task | None = None
+        self._resumed_at = 0.0
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._writers = 0
+        self._flush_task: asyncio.Task | None = None
+        self._save_lock = threading.Lock()
+        self._save_seq = 0
+        self._saved_seq = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def resumable(self) -> bool:
+        return self.state is not None and self.state["state"] in ("running", "failed")
+
+    @asynccontextmanager
+    async def guard_write(self) -> AsyncIterator[None]:
+        """Hold a live-index write while the final replay and alias swap run."""
+        await self._writable.wait()
+        self._writers += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._writers -= 1
+            if not self._writers:
+                self._idle.set()
+
+    def record(self, doc_id: str, deleted: bool = False) -> None:
+        """Note a document written to the live index so it is replayed before the swap."""
+        if not self.resumable():
+            return
+        self.state["pending"][doc_id] = "delete" if deleted else "index"
+        # Writes within RECORD_FLUSH_SECONDS share one checkpoint write; the
+        # running job also saves them at every batch and before the swap.
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(RECORD_FLUSH_SECONDS)
+        finally:
+            self._flush_task = None
+        await self._flush()
+
+    def _load(self) -> Dict[str, Any] | None:
+        try:
+            return json.loads(self.checkpoint.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _snapshot(self) -> Tuple[int, str]:
+        self._save_seq += 1
+        return self._save_seq, json.dumps(self.state)
+
+    def _write(self, seq: int, data: str) -> None:
+        # Writes may finish out of order across threads; never let an older
+        # snapshot replace a newer one.
+        with self._save_lock:
+            if seq < self._saved_seq:
+                return
+            self.checkpoint.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.checkpoint.with_suffix(".json.tmp")
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, self.checkpoint)
+            self._saved_seq = seq
+
+    def _save(self) -> None:
+        self._write(*self._snapshot())
+
+    async def _flush(self) -> None:
+        await asyncio.to_thread(self._write, *self._snapshot())
+
+    def _elapsed(self) -> float:
+        if self.state is None:
+            return 0.0
+        running = time.monotonic() - self._resumed_at if self.running else 0.0
+        return self.state["elapsedSeconds"] + running
+
+    def tracks_per_minute(self) -> float:
+        elapsed = self._elapsed()
+        if self.state is None or not elapsed:
+            return 0.0
+        return self.state["analyzed"] * 60 / elapsed
+
+    def status(self) -> Dict[str, Any]:
+        if self.state is None:
+            return {"state": "idle"}
+        return {
+            **self.state,
+            "pending": len(self.state["pending"]),
+            "completedShards": len(self.state["completedShards"]),
+            "elapsedSeconds": round(self._elapsed(), 1),
+            "tracksPerMinute": round(self.tracks_per_minute(), 2),
+        }
+
+    def start(self, client: AsyncElasticsearch, resume: bool = True) -> Dict[str, Any]:
+        if self.running:
+            raise RuntimeError("A reindex is already running")
+        if not (resume and self.resumable()):
+            self.state = {
+                "state": "running",
+                "phase": "copy",
+                "source": None,
+                "target": None,
+                "alias": self.alias,
+                "completedShards": [],
+                "shard": None,
+                "shardOffset": 0,
+                "analyzed": 0,
+                "updated": 0,
+                "skipped": 0,
+                "failed": 0,
+                "replayed": 0,
+                "pending": {},
+                "elapsedSeconds": 0.0,
+                "startedAt": datetime.utcnow().isoformat(),
+                "finishedAt": None,
+                "error": None,
+            }
+        self.state.setdefault("pending", {})
+        self.state.setdefault("replayed", 0)
+        self.state.update(state="running", error=None)
+        self._save()
+        self._task = asyncio.create_task(self._run(client))
+        return self.status()
+
+    async def stop(self) -> None:
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await self._flush()
+
+    async def _run(self, client: AsyncElasticsearch) -> None:
+        self._resumed_at = time.monotonic()
+        try:
+            if self.state["target"] is None:
+                await self._create_target(client)
+            if self.state["phase"] == "copy":
+                await self._copy(client)
+                await self._advance("analyze")
+            if self.state["phase"] == "analyze":
+                await self._analyze_all(client)
+                await self._advance("catchup")
+            if self.state["phase"] == "catchup":
+                await self._copy(client)
+                await self._replay(client)
+                await self._advance("swap")
+            if self.state["phase"] == "swap":
+                await self._swap(client)
+            await self._advance("done", state="done", finishedAt=datetime.utcnow().isoformat())
+            log.info(
+                "Reindex into %s finished: %d tracks at %.1f tracks/min",
+                self.state["target"],
+                self.state["analyzed"],
+                self.tracks_per_minute(),
+            )
+        except asyncio.CancelledError:
+            await self._checkpoint()
+            raise
+        except Exception as exc:  # noqa: BLE001
+            log.error("Reindex failed in phase %s: %s", self.state["phase"], exc)
+            self.state.update(state="failed", error=str(exc))
+            await self._checkpoint()
+
+    async def _checkpoint(self) -> None:
+        now = time.monotonic()
+        self.state["elapsedSeconds"] += now - self._resumed_at
+        self._resumed_at = now
+        await self._flush()
+
+    async def _advance(self, phase: str, **changes: Any) -> None:
+        self.state.update(phase=phase, **changes)
+        await self._checkpoint()
+
+    async def _create_target(self, client: AsyncElasticsearch) -> None:
+        source, _ = await resolve_alias(client, self.alias)
+        target = versioned_name(self.alias)
+        definition = self.definition()
+        settings = {**definition.get("settings", {}), "refresh_interval": "-1"}
+        await client.indices.create(index=target, **{**definition, "settings": settings})
+        self.state.update(source=source, target=target)
+        await self._checkpoint()
+        log.info("Reindexing %s into %s", source or "(nothing)", target)
+
+    async def _copy(self, client: AsyncElasticsearch) -> None:
+        # op_type=create keeps documents already re-analysed in the target,
+        # so the same call serves the first copy, a resumed copy and the
+        # catch-up pass for documents created while the job ran. Updates and
+        # deletes are not visible to it; _replay handles those.
+        if self.state["source"] is None:
+            return
+        resp = await client.reindex(
+            source={"index": self.state["source"]},
+            dest={"index": self.state["target"], "op_type": "create"},
+            conflicts="proceed",
+            wait_for_completion=False,
+        )
+        task_id = resp["task"]
+        while True:
+            task = await client.tasks.get(task_id=task_id)
+            if task.get("completed"):
+                break
+            await asyncio.sleep(COPY_POLL_SECONDS)
+        failures = task.get("response", {}).get("failures") or []
+        if task.get("error") or failures:
+            reason = task.get("error") or failures[0]
+            raise RuntimeError(f"Copy into {self.state['target']} failed: {reason}")
+        await client.indices.refresh(index=self.state["target"])
+
+    async def _analyze_all(self, client: AsyncElasticsearch) -> None:
+        shards = self.stored_files()
+        done = set(self.state["completedShards"])
+        while (item := await asyncio.to_thread(next, shards, None)) is not None:
+            shard, files = item
+            if shard in done:
+                continue
+            files.sort()
+            start = self.state["shardOffset"] if self.state["shard"] == shard else 0
+            for offset in range(start, len(files), self.batch_size):
+                await self._analyze_batch(client, files[offset : offset + self.batch_size])
+                self.state.update(shard=shard, shardOffset=offset + self.batch_size)
+                await self._checkpoint()
+            self.state["completedShards"].append(shard)
+            self.state.update(shard=None, shardOffset=0)
+            await self._checkpoint()
+
+    async def _analyze_batch(
+        self, client: AsyncElasticsearch, files: List[Tuple[str, Path]]
+    ) -> None:
+        names = [name for name, _ in files]
+        resp = await client.search(
+            index=self.state["target"],
+            query={"terms": {"storedFileName.keyword": names}},
+            size=TERMS_PAGE,
+        )
+        documents: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        for hit in resp["hits"]["hits"]:
+            source = hit["_source"]
+            documents.setdefault(source.get("storedFileName"), []).append((hit["_id"], source))
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def run(name: str, path: Path) -> Tuple[str, Dict[str, Any] | None]:
+            async with slots:
+                try:
+                    return name, await self.analyze(name, path)
+                except Exception as exc:  # noqa: BLE001
+                    log.warning("Reindex could not analyse %s: %s", name, exc)
+                    return name, None
+
+        wanted = [(name, path) for name, path in files if name in documents]
+        self.state["skipped"] += len(files) - len(wanted)
+        operations: List[Dict[str, Any]] = []
+        for name, fields in await asyncio.gather(*(run(name, path) for name, path in wanted)):
+            if fields is None:
+                self.state["failed"] += 1
+                continue
+            self.state["analyzed"] += 1
+            # Whole documents are rewritten rather than partially updated so
+            # object fields such as scores lose labels the new model dropped.
+            for doc_id, source in documents[name]:
+                operations.append({"index": {"_index": self.state["target"], "_id": doc_id}})
+                operations.append({**source, **fields})
+        if operations:
+            await self._bulk(client, operations)
+
+    async def _replay(self, client: AsyncElasticsearch) -> None:
+        """Apply recorded updates and deletes from the live index to the target.
+
+        Updated documents are re-read from the live index, keeping the
+        re-analysed ``preserve`` fields already in the target.
+        """
+        source, target = self.state["source"], self.state["target"]
+        while self.state["pending"]:
+            pending = self.state["pending"]
+            batch = dict(list(pending.items())[:REPLAY_BATCH])
+            for doc_id in batch:
+                del pending[doc_id]
+            operations: List[Dict[str, Any]] = []
+            updated = [doc_id for doc_id, op in batch.items() if op == "index"]
+            if updated and source is not None:
+                live = await client.mget(index=source, ids=updated)
+                rebuilt = await client.mget(index=target, ids=updated)
+                fresh = {d["_id"]: d["_source"] for d in rebuilt["docs"] if d.get("found")}
+                for doc in live["docs"]:
+                    if not doc.get("found"):
+                        batch[doc["_id"]] = "delete"
+                        continue
+                    analysed = fresh.get(doc["_id"], {})
+                    kept = {field: analysed[field] for field in self.preserve if field in analysed}
+                    operations.append({"index": {"_index": target, "_id": doc["_id"]}})
+                    operations.append({**doc["_source"], **kept})
+            for doc_id, op in batch.items():
+                if op == "delete":
+                    operations.append({"delete": {"_index": target, "_id": doc_id}})
+            if operations:
+                await self._bulk(client, operations, "replayed")
+            await self._checkpoint()
+
+    async def _bulk(
+        self, client: AsyncElasticsearch, operations: List[Dict[str, Any]], counter: str = "updated"
+    ) -> None:
+        resp = await client.bulk(operations=operations)
+        for item in resp.get("items", []):
+            result = next(iter(item.values()), {})
+            status = result.get("status", 500)
+            # Deleting a document the target never had is already done.
+            if status < 300 or (status == 404 and "delete" in item):
+                self.state[counter] += 1
+            else:
+                self.state["failed"] += 1
+                log.warning(
+                    "Reindex update of %s failed: %s", result.get("_id"), result.get("error")
+                )
+
+    async def _swap(self, client: AsyncElasticsearch) -> None:
+        target = self.state["target"]
+        await client.indices.put_settings(
+            index=target, settings={"index": {"refresh_interval": None}}
+        )
+        current, is_alias = await resolve_alias(client, self.alias)
+        if current == target:
+            return
+        # Hold new writes and let in-flight ones finish, so the last replay
+        # sees everything written to the old index.
+        self._writable.clear()
+        try:
+            await self._idle.wait()
+            await self._replay(client)
+            await client.indices.refresh(index=target)
+            await self._apply_swap(client, current, is_alias)
+        finally:
+            self._writable.set()
+
+    async def _apply_swap(
+        self, client: AsyncElasticsearch, current: str | None, is_alias: bool
+    ) -> None:
+        target = self.state["target"]
+        actions: List[Dict[str, Any]] = [{"add": {"index": target, "alias": self.alias}}]
+        if current is not None and is_alias:
+            actions.append({"remove": {"index": current, "alias": self.alias}})
+        elif current is not None:
+            # The live data is a concrete index named like the alias; it has
+            # already been copied, and ES drops it in the same atomic call.
+            actions.append({"remove_index": {"index": current}})
+        await client.indices.update_aliases(actions=actions)
+        log.info("Alias %s now points at %s", self.alias, target)
+        if self.on_swap is not None:
+            self.on_swap()
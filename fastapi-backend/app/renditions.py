@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import os
+import secrets
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+log = logging.getLogger("audio_service.renditions")
+
+FORMATS: Dict[str, Dict[str, Any]] = {
+    "opus": {
+        "file": "audio.opus",
+        "media_type": "audio/ogg",
+        "args": ["-c:a", "libopus", "-f", "ogg"],
+    },
+    "aac": {
+        "file": "audio.m4a",
+        "media_type": "audio/mp4",
+        "args": ["-c:a", "aac", "-movflags", "+faststart", "-f", "mp4"],
+    },
+}
+ACCEPT_FORMATS = (
+    ("audio/ogg", "opus"),
+    ("audio/opus", "opus"),
+    ("application/ogg", "opus"),
+    ("audio/mp4", "aac"),
+    ("audio/aac", "aac"),
+)
+HLS_DIR = "hls"
+HLS_PLAYLIST = "index.m3u8"
+HLS_MEDIA_TYPES = {".m3u8": "application/vnd.apple.mpegurl", ".ts": "video/mp2t"}
+TOUCH_INTERVAL = 60.0
+
+
+def folder_size(folder: Path) -> int:
+    return sum(f.stat().st_size for f in folder.rglob("*") if f.is_file())
+
+
+class RenditionStore:
+    """Size-bounded directory of transcoded renditions, one folder per upload.
+
+    Each folder is built in a temporary directory and renamed into place, so a
+    folder that exists is complete. The folder mtime records the last access
+    and the least recently used folders are removed once ``max_bytes`` is
+    exceeded; folder sizes are kept as a running total after one initial
+    scan, so a build does not re-walk the cache. A failed build is not retried for ``retry_seconds``, so a file
+    ffmpeg cannot decode does not start new transcodes on every request.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int,
+        bitrate_kbps: int,
+        formats: Sequence[str],
+        segment_seconds: float,
+        concurrency: int,
+        retry_seconds: float = 3600.0,
+    ) -> None:
+        root.mkdir(parents=True, exist_ok=True)
+        self.root = root
+        self.max_bytes = max_bytes
+        self.bitrate_kbps = bitrate_kbps
+        self.formats = [name for name in formats if name in FORMATS]
+        self.segment_seconds = segment_seconds
+        self.retry_seconds = retry_seconds
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._building: Dict[str, asyncio.Task] = {}
+        self._touched: Dict[str, float] = {}
+        self._failed_until: Dict[str, float] = {}
+        self._sizes: Dict[str, int] | None = None
+        self._total = 0
+        self.built = 0
+        self.failed = 0
+        self.evicted = 0
+
+    def negotiate(self, requested: str | None, accept: str | None) -> str | None:
+        if requested:
+            return requested if requested in self.formats else None
+        accept = (accept or "").lower()
+        for media_type, name in ACCEPT_FORMATS:
+            if media_type in accept and name in self.formats:
+                return name
+        return None
+
+    def lookup(self, name: str, fmt: str) -> Path | None:
+        path = self.root / name / FORMATS[fmt]["file"]
+        if not path.is_file():
+            return None
+        self._touch(name)
+        return path
+
+    def lookup_hls(self, name: str, asset: str) -> Path | None:
+        path = self.root / name / HLS_DIR / asset
+        if not path.is_file():
+            return None
+        self._touch(name)
+        return path
+
+    def _touch(self, name: str) -> None:
+        now = time.time()
+        if now - self._touched.get(name, 0) < TOUCH_INTERVAL:
+            return
+        self._touched[name] = now
+        try:
+            os.utime(self.root / name)
+        except FileNotFoundError:
+            pass
+
+    def schedule(self, name: str, src: Path) -> None:
+        if name in self._building or (self.root / name).is_dir():
+            return
+        retry_at = self._failed_until.get(name)
+        if retry_at is not None:
+            if time.monotonic() < retry_at:
+                return
+            del self._failed_until[name]
+        task = asyncio.create_task(self._build(name, src))
+        self._building[name] = task
+        task.add_done_callback(lambda _: self._building.pop(name, None))
+
+    async def _build(self, name: str, src: Path) -> None:
+        async with self._slots:
+            target = self.root / name
+            if target.is_dir():
+                return
+            staging = self.root / f".{name}.{secrets.token_hex(4)}.tmp"
+            (staging / HLS_DIR).mkdir(parents=True)
+            try:
+                for fmt in self.formats:
+                    await self._ffmpeg(src, FORMATS[fmt]["args"], staging / FORMATS[fmt]["file"])
+                await self._ffmpeg(
+                    src,
+                    [
+                        "-c:a",
+                        "aac",
+                        "-f",
+                        "hls",
+                        "-hls_time",
+                        str(self.segment_seconds),
+                        "-hls_playlist_type",
+                        "vod",
+                        "-hls_segment_filename",
+                        str(staging / HLS_DIR / "seg_%05d.ts"),
+                    ],
+                    staging / HLS_DIR / HLS_PLAYLIST,
+                )
+                size = await asyncio.to_thread(folder_size, staging)
+                os.replace(staging, target)
+                self.built += 1
+                log.info("Built renditions for %s", name)
+            except Exception as exc:  # noqa: BLE001
+                self.failed += 1
+                self._failed_until[name] = time.monotonic() + self.retry_seconds
+                log.warning("Rendition build failed for %s: %s", name, exc)
+                return
+            finally:
+                if staging.exists():
+                    await asyncio.to_thread(shutil.rmtree, staging, True)
+            if self._sizes is None:
+                await asyncio.to_thread(self._scan)
+            else:
+                self._sizes[name] = size
+                self._total += size
+            if self._total > self.max_bytes:
+                await asyncio.to_thread(self.evict)
+
+    async def _ffmpeg(self, src: Path, args: List[str], output: Path) -> None:
+        cmd = [
+            "ffmpeg",
+            "-nostdin",
+            "-v",
+            "error",
+            "-y",
+            "-i",
+            str(src),
+            "-vn",
+            "-b:a",
+            f"{self.bitrate_kbps}k",
+            *args,
+            str(output),
+        ]
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            raise RuntimeError(stderr.decode(errors="replace").strip() or "ffmpeg failed")
+
+    def _scan(self) -> None:
+        sizes = {}
+        for folder in self.root.iterdir():
+            if folder.is_dir() and not folder.name.startswith("."):
+                sizes[folder.name] = folder_size(folder)
+        self._sizes = sizes
+        self._total = sum(sizes.values())
+
+    def evict(self) -> None:
+        if self._sizes is None:
+            self._scan()
+        if self._total <= self.max_bytes:
+            return
+        entries = []
+        for name, size in list(self._sizes.items()):
+            try:
+                entries.append(((self.root / name).stat().st_mtime, size, name))
+            except FileNotFoundError:
+                self._forget(name)
+        entries.sort()
+        for _, _, name in entries:
+            if self._total <= self.max_bytes:
+                break
+            shutil.rmtree(self.root / name, ignore_errors=True)
+            self._forget(name)
+            self._touched.pop(name, None)
+            self.evicted += 1
+
+    def _forget(self, name: str) -> None:
+        if self._sizes is not None:
+            self._total -= self._sizes.pop(name, 0)
+
+    def discard(self, name: str) -> None:
+        shutil.rmtree(self.root / name, ignore_errors=True)
+        self._forget(name)
+        self._touched.pop(name, None)
+        self._failed_until.pop(name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "formats": self.formats,
+            "bitrateKbps": self.bitrate_kbps,
+            "building": len(self._building),
+            "built": self.built,
+            "failed": self.failed,
+            "backingOff": len(self._failed_until),
+            "evicted": self.evicted,
+            "bytes": self._total if self._sizes is not None else None,
+            "maxBytes": self.max_bytes,
+        }
@@ -0,0 +1,94 @@
+import logging
+import re
+import secrets
+import time
+from contextvars import ContextVar
+from typing import Callable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import Counter, Gauge, HistogramFamily
+
+TRACE_HEADER = "x-request-id"
+_VALID_TRACE_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+trace_id_var: ContextVar[str] = ContextVar("trace_id", default="-")
+
+
+def install_log_trace_ids() -> None:
+    """Give every log record a ``trace_id`` attribute from the current context.
+
+    ``asyncio.to_thread`` copies the context, so records emitted from worker
+    threads carry the id of the request that scheduled them.
+    """
+    factory = logging.getLogRecordFactory()
+
+    def record_factory(*args, **kwargs) -> logging.LogRecord:
+        record = factory(*args, **kwargs)
+        record.trace_id = trace_id_var.get()
+        return record
+
+    logging.setLogRecordFactory(record_factory)
+
+
+class RequestMetricsMiddleware:
+    """Count in-flight requests, time them per route and optionally tag them with a trace id.
+
+    With ``trace_ids`` on, an incoming ``X-Request-ID`` is reused (when it is
+    a short token) or a fresh id is generated, bound to ``trace_id_var`` for
+    the life of the request and echoed back in the response headers.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        route_of: Callable[[Scope], str],
+        in_flight: Gauge,
+        duration: HistogramFamily,
+        responses: Counter,
+        trace_ids: bool = False,
+    ) -> None:
+        self.app = app
+        self.route_of = route_of
+        self.in_flight = in_flight
+        self.duration = duration
+        self.responses = responses
+        self.trace_ids = trace_ids
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = self.route_of(scope)
+        method = scope["method"]
+        token = None
+        trace_id = None
+        if self.trace_ids:
+            incoming = dict(scope["headers"]).get(TRACE_HEADER.encode(), b"").decode("latin-1")
+            trace_id = incoming if _VALID_TRACE_ID.match(incoming) else secrets.token_hex(8)
+            token = trace_id_var.set(trace_id)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trace_id is not None:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (TRACE_HEADER.encode(), trace_id.encode()),
+                    ]
+            await send(message)
+
+        self.in_flight.inc(route=route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight.dec(route=route)
+            self.duration.labels(route=route, method=method).observe(
+                time.perf_counter() - started
+            )
+            self.responses.inc(route=route, method=method, status=str(status))
+            if token is not None:
+                trace_id_var.reset(token)
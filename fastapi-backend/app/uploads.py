@@ -0,0 +1,273 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import secrets
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Tuple
+
+log = logging.getLogger("audio_service.uploads")
+
+CONTENT_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+SHARD = re.compile(r"^[0-9a-f]{2}$")
+SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+INCOMING_DIR = ".incoming"
+WRITE_BUFFER = 1024 * 1024
+HASH_CHUNK = 4 * 1024 * 1024
+
+
+def sha256_file(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with path.open("rb") as handle:
+        while chunk := handle.read(HASH_CHUNK):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class UploadError(Exception):
+    def __init__(self, status_code: int, detail: str, offset: int | None = None) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.offset = offset
+
+
+class UploadStore:
+    """Content-addressed upload storage sharded as ``ab/cd/<sha256>``.
+
+    Files from before sharding live flat in the root and are still resolved.
+    Resumable sessions keep a ``<id>.part`` data file and a ``<id>.json``
+    descriptor under ``.incoming``; the size of the data file is the offset.
+    """
+
+    def __init__(self, root: Path, max_bytes: int, max_chunk_bytes: int) -> None:
+        self.root = root
+        self.incoming = root / INCOMING_DIR
+        self.incoming.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_chunk_bytes = max_chunk_bytes
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def resolve(self, name: str) -> Path | None:
+        if CONTENT_DIGEST.match(name):
+            sharded = self.path_for(name)
+            if sharded.is_file():
+                return sharded
+        legacy = self.root / name
+        return legacy if legacy.is_file() else None
+
+    def relative(self, path: Path) -> str:
+        return path.relative_to(self.root).as_posix()
+
+    def temp_path(self) -> Path:
+        return self.incoming / f"{secrets.token_hex(16)}.tmp"
+
+    def store(self, tmp: Path, digest: str) -> Path:
+        target = self.path_for(digest)
+        try:
+            # Re-uploads restart the orphan grace period for the stored copy.
+            os.utime(target)
+        except FileNotFoundError:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp.replace(target)
+        else:
+            tmp.unlink(missing_ok=True)
+        return target
+
+    # Resumable sessions
+
+    def _descriptor(self, upload_id: str) -> Path:
+        return self.incoming / f"{upload_id}.json"
+
+    def _data(self, upload_id: str) -> Path:
+        return self.incoming / f"{upload_id}.part"
+
+    def create(self, file_name: str | None, size: int, sha256: str | None) -> Dict[str, Any]:
+        if size <= 0 or size > self.max_bytes:
+            raise UploadError(413, f"Upload size must be between 1 and {self.max_bytes} bytes")
+        if sha256 is not None and not CONTENT_DIGEST.match(sha256):
+            raise UploadError(400, "sha256 must be 64 lowercase hex characters")
+        upload_id = secrets.token_hex(16)
+        now = time.time()
+        session = {
+            "id": upload_id,
+            "fileName": file_name,
+            "size": size,
+            "sha256": sha256,
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        self._data(upload_id).touch()
+        self._write_descriptor(session)
+        return {**session, "offset": 0}
+
+    def _write_descriptor(self, session: Dict[str, Any]) -> None:
+        target = self._descriptor(session["id"])
+        tmp = target.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(session), encoding="utf-8")
+        os.replace(tmp, target)
+
+    def get(self, upload_id: str) -> Dict[str, Any] | None:
+        if not SESSION_ID.match(upload_id):
+            return None
+        try:
+            session = json.loads(self._descriptor(upload_id).read_text(encoding="utf-8"))
+            offset = self._data(upload_id).stat().st_size
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return {**session, "offset": offset}
+
+    async def write_chunk(
+        self,
+        upload_id: str,
+        offset: int,
+        body: AsyncIterator[bytes],
+        checksum: str | None,
+    ) -> Dict[str, Any]:
+        """Append ``body`` at ``offset``; on any failure the file is cut back to ``offset``."""
+        expected = self._parse_checksum(checksum) if checksum else None
+        lock = self._locks.setdefault(upload_id, asyncio.Lock())
+        if lock.locked():
+            raise UploadError(409, "Another chunk is being written to this upload")
+        try:
+            return await self._write_locked(lock, upload_id, offset, body, expected)
+        finally:
+            if not lock.locked():
+                self._locks.pop(upload_id, None)
+
+    async def _write_locked(
+        self,
+        lock: asyncio.Lock,
+        upload_id: str,
+        offset: int,
+        body: AsyncIterator[bytes],
+        expected: bytes | None,
+    ) -> Dict[str, Any]:
+        async with lock:
+            session = await asyncio.to_thread(self.get, upload_id)
+            if session is None:
+                raise UploadError(404, "Unknown upload")
+            if offset != session["offset"]:
+                raise UploadError(409, "Offset does not match", session["offset"])
+            data = self._data(upload_id)
+            hasher = hashlib.sha256()
+            written = 0
+            fd = await asyncio.to_thread(os.open, data, os.O_WRONLY)
+            try:
+                buffered: List[bytes] = []
+                pending = 0
+                async for piece in body:
+                    written += len(piece)
+                    if written > self.max_chunk_bytes or offset + written > session["size"]:
+                        raise UploadError(413, "Chunk exceeds the chunk or upload size limit")
+                    hasher.update(piece)
+                    buffered.append(piece)
+                    pending += len(piece)
+                    if pending >= WRITE_BUFFER:
+                        await asyncio.to_thread(
+                            os.pwrite, fd, b"".join(buffered), offset + written - pending
+                        )
+                        buffered, pending = [], 0
+                if buffered:
+                    await asyncio.to_thread(
+                        os.pwrite, fd, b"".join(buffered), offset + written - pending
+                    )
+                if expected is not None and hasher.digest() != expected:
+                    raise UploadError(460, "Chunk checksum mismatch", offset)
+            except BaseException:
+                await asyncio.to_thread(os.ftruncate, fd, offset)
+                raise
+            finally:
+                os.close(fd)
+            session["updatedAt"] = time.time()
+            await asyncio.to_thread(
+                self._write_descriptor, {k: v for k, v in session.items() if k != "offset"}
+            )
+        return {**session, "offset": offset + written}
+
+    @staticmethod
+    def _parse_checksum(header: str) -> bytes:
+        algorithm, _, value = header.strip().partition(" ")
+        if algorithm.lower() != "sha256":
+            raise UploadError(400, "Only sha256 chunk checksums are supported")
+        try:
+            return base64.b64decode(value.strip(), validate=True)
+        except ValueError:
+            raise UploadError(400, "Checksum must be base64 encoded")
+
+    def commit(self, upload_id: str) -> Tuple[Path, str, Dict[str, Any]]:
+        session = self.get(upload_id)
+        if session is None:
+            raise UploadError(404, "Unknown upload")
+        if session["offset"] != session["size"]:
+            raise UploadError(409, "Upload is incomplete", session["offset"])
+        data = self._data(upload_id)
+        digest = sha256_file(data)
+        if session["sha256"] and session["sha256"] != digest:
+            raise UploadError(400, "Upload does not match the declared sha256")
+        target = self.store(data, digest)
+        self._descriptor(upload_id).unlink(missing_ok=True)
+        return target, digest, session
+
+    def abort(self, upload_id: str) -> bool:
+        if not SESSION_ID.match(upload_id):
+            return False
+        existed = self._descriptor(upload_id).exists()
+        self._data(upload_id).unlink(missing_ok=True)
+        self._descriptor(upload_id).unlink(missing_ok=True)
+        return existed
+
+    # Reaping
+
+    def reap_incoming(self, max_age: float) -> int:
+        """Remove sessions and temp files untouched for ``max_age`` seconds."""
+        cutoff = time.time() - max_age
+        removed = 0
+        # Partials written straight into the root by older releases.
+        stale_roots = [e for e in os.scandir(self.root) if e.name.endswith(".part") and e.is_file()]
+        for entry in [*os.scandir(self.incoming), *stale_roots]:
+            try:
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+                os.unlink(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    def iter_stored(self, min_age: float) -> Iterator[Tuple[str, List[Tuple[str, Path]]]]:
+        """Yield ``(shard, files)`` for files older than ``min_age``, one top-level shard at a time.
+
+        Flat files from before sharding come last under the shard name ``legacy``.
+        """
+        cutoff = time.time() - min_age
+        legacy: List[Tuple[str, Path]] = []
+        for top in os.scandir(self.root):
+            if top.name.startswith("."):
+                continue
+            if top.is_file(follow_symlinks=False):
+                if top.stat().st_mtime < cutoff:
+                    legacy.append((top.name, Path(top.path)))
+                continue
+            if not SHARD.match(top.name):
+                continue
+            batch: List[Tuple[str, Path]] = []
+            for path in Path(top.path).glob("*/*"):
+                if not CONTENT_DIGEST.match(path.name):
+                    continue
+                try:
+                    if path.is_file() and path.stat().st_mtime < cutoff:
+                        batch.append((path.name, path))
+                except FileNotFoundError:
+                    continue
+            if batch:
+                yield top.name, batch
+        if legacy:
+            yield "legacy", legacy
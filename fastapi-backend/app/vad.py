@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+Region = Tuple[int, int]
+
+SPECTRAL_BLOCK_FRAMES = 4096
+
+
+@dataclass(frozen=True)
+class VadConfig:
+    frame_ms: float = 30.0
+    relative_db: float = -35.0
+    floor_db: float = -60.0
+    max_flatness: float = 0.6
+    min_voice_ratio: float = 0.2
+    voice_band_hz: Tuple[float, float] = (300.0, 3400.0)
+    min_speech_s: float = 0.5
+    min_gap_s: float = 1.5
+    pad_s: float = 0.3
+
+
+def frame_features(
+    audio: np.ndarray, sample_rate: int, config: VadConfig
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-frame level (dBFS), spectral flatness and voice-band energy ratio.
+
+    Frames are a reshaped view of ``audio``; the FFT runs over blocks of
+    frames so the spectrum of an hour-long track is never held at once.
+    """
+    frame_len = max(16, int(sample_rate * config.frame_ms / 1000))
+    usable = audio.size - audio.size % frame_len
+    frames = audio[:usable].reshape(-1, frame_len)
+    energy = np.einsum("ij,ij->i", frames, frames) / frame_len
+    level_db = 10 * np.log10(energy + 1e-12)
+
+    window = np.hanning(frame_len).astype(np.float32)
+    freqs = np.fft.rfftfreq(frame_len, 1 / sample_rate)
+    band = (freqs >= config.voice_band_hz[0]) & (freqs <= config.voice_band_hz[1])
+    flatness = np.empty(frames.shape[0], dtype=np.float32)
+    voice_ratio = np.empty(frames.shape[0], dtype=np.float32)
+    for start in range(0, frames.shape[0], SPECTRAL_BLOCK_FRAMES):
+        block = frames[start : start + SPECTRAL_BLOCK_FRAMES]
+        power = np.abs(np.fft.rfft(block * window, axis=1)) ** 2 + 1e-12
+        mean_power = power.mean(axis=1)
+        flatness[start : start + block.shape[0]] = np.exp(np.log(power).mean(axis=1)) / mean_power
+        voice_ratio[start : start + block.shape[0]] = power[:, band].sum(axis=1) / power.sum(axis=1)
+    return level_db, flatness, voice_ratio
+
+
+def detect_speech(audio: np.ndarray, sample_rate: int, config: VadConfig) -> List[Region]:
+    if audio.size == 0:
+        return []
+    frame_len = max(16, int(sample_rate * config.frame_ms / 1000))
+    level_db, flatness, voice_ratio = frame_features(audio, sample_rate, config)
+    if level_db.size == 0:
+        return [(0, audio.size)]
+    active = (
+        (level_db >= level_db.max() + config.relative_db)
+        & (level_db >= config.floor_db)
+        & (flatness <= config.max_flatness)
+        & (voice_ratio >= config.min_voice_ratio)
+    )
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if starts.size == 0:
+        return []
+
+    frame_s = frame_len / sample_rate
+    gap_frames = config.min_gap_s / frame_s
+    keep = np.concatenate(([True], (starts[1:] - ends[:-1]) > gap_frames))
+    merged_starts = starts[keep]
+    merged_ends = np.maximum.reduceat(ends, np.flatnonzero(keep))
+
+    long_enough = (merged_ends - merged_starts) * frame_s >= config.min_speech_s
+    pad = int(config.pad_s * sample_rate)
+    regions: List[Region] = []
+    for start, end in zip(merged_starts[long_enough], merged_ends[long_enough]):
+        lo = max(0, int(start) * frame_len - pad)
+        hi = min(audio.size, int(end) * frame_len + pad)
+        if regions and lo <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], hi)
+        else:
+            regions.append((lo, hi))
+    return regions
+
+
+class Timeline:
+    """Map times in concatenated speech audio back to the original track."""
+
+    def __init__(self, regions: List[Region], sample_rate: int) -> None:
+        lengths = np.array([end - start for start, end in regions], dtype=np.int64)
+        self.sample_rate = sample_rate
+        self.packed_starts = (np.cumsum(lengths) - lengths) / sample_rate
+        self.original_starts = np.array([start for start, _ in regions], dtype=np.float64) / sample_rate
+        self.speech_seconds = float(lengths.sum()) / sample_rate
+
+    def to_original(self, seconds: float) -> float:
+        if self.packed_starts.size == 0:
+            return seconds
+        index = max(0, int(np.searchsorted(self.packed_starts, seconds, side="right")) - 1)
+        return float(self.original_starts[index] + seconds - self.packed_starts[index])
+
+
+def pack_speech(
+    audio: np.ndarray, sample_rate: int, config: VadConfig
+) -> Tuple[np.ndarray, Timeline, float]:
+    """Return only the speech regions of ``audio``, their timeline and the skipped fraction."""
+    regions = detect_speech(audio, sample_rate, config)
+    timeline = Timeline(regions, sample_rate)
+    if not regions:
+        return audio[:0], timeline, 1.0 if audio.size else 0.0
+    packed = np.concatenate([audio[start:end] for start, end in regions])
+    skipped = 1 - packed.size / audio.size
+    return packed, timeline, skipped
@@ -0,0 +1,45 @@
+import re
+from typing import List, Sequence
+
+import numpy as np
+
+_WORD = re.compile(r"[^\w']+")
+
+
+def split_windows(
+    audio: np.ndarray, sample_rate: int, window_s: float, overlap_s: float
+) -> List[np.ndarray]:
+    """Cut ``audio`` into views of ``window_s`` seconds that overlap by ``overlap_s``."""
+    window = max(1, int(window_s * sample_rate))
+    step = max(1, window - int(overlap_s * sample_rate))
+    if audio.size <= window:
+        return [audio]
+    starts = range(0, audio.size - int(overlap_s * sample_rate), step)
+    return [audio[start : start + window] for start in starts]
+
+
+def _normalize(word: str) -> str:
+    return _WORD.sub("", word.lower())
+
+
+def stitch_texts(texts: Sequence[str], max_overlap_words: int = 12) -> str:
+    """Join window transcripts, dropping words repeated across each overlap.
+
+    The longest run of words that ends one transcript and starts the next
+    (compared case- and punctuation-insensitively) is kept only once.
+    """
+    merged: List[str] = []
+    for text in texts:
+        words = text.split()
+        if not words:
+            continue
+        limit = min(max_overlap_words, len(words), len(merged))
+        tail = [_normalize(word) for word in merged[-limit:]] if limit else []
+        head = [_normalize(word) for word in words[:limit]]
+        overlap = 0
+        for size in range(limit, 0, -1):
+            if tail[-size:] == head[:size] and any(head[:size]):
+                overlap = size
+                break
+        merged.extend(words[overlap:])
+    return " ".join(merged)
@@ -0,0 +1,189 @@
+"""Compare inference backends for accuracy and latency on a fixed local audio set.
+
+    python benchmarks/bench_backends.py samples/ --output backends.json
+    python benchmarks/bench_backends.py samples/ --backends pytorch,onnx --intra 4 --inter 1
+
+Every audio file in the directory is transcribed and its text classified by
+each backend, in a fresh interpreter per backend so load time and peak
+resident memory are measured in isolation. A ``<name>.txt`` next to a file
+is used as its reference transcript; without one, word error rate is
+reported against the baseline backend's output instead. Emotion agreement
+is always measured against the baseline. Needs ffmpeg on PATH, and
+requirements/onnx.txt for the onnx backend.
+"""
+
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+AUDIO_SUFFIXES = {".wav", ".mp3", ".flac", ".ogg", ".opus", ".m4a", ".aac", ".webm"}
+SAMPLE_RATE = 16000
+
+
+def audio_files(directory: Path) -> List[Path]:
+    return sorted(p for p in directory.iterdir() if p.suffix.lower() in AUDIO_SUFFIXES)
+
+
+def decode(path: Path):
+    import numpy as np
+
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-i", str(path)]
+    cmd += ["-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"]
+    proc = subprocess.run(cmd, capture_output=True, check=True)
+    return np.frombuffer(proc.stdout, dtype=np.float32)
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def run_worker(args: argparse.Namespace) -> None:
+    from app.inference_backends import SPEECH_TASK, TEXT_TASK, BackendConfig, build_pipeline
+    from app.main import EMOTION_MODEL, SPEECH_CHUNKING, SPEECH_MODEL
+
+    config = BackendConfig(args.worker, Path(args.cache_dir), args.intra, args.inter)
+    started = time.perf_counter()
+    speech = build_pipeline(SPEECH_TASK, SPEECH_MODEL, config)
+    emotion = build_pipeline(TEXT_TASK, EMOTION_MODEL, config)
+    load_seconds = time.perf_counter() - started
+
+    tracks = []
+    for path in audio_files(Path(args.audio_dir)):
+        audio = decode(path)
+        reference = path.with_suffix(".txt")
+        speech_seconds = []
+        for _ in range(args.repeats):
+            started = time.perf_counter()
+            result = speech({"array": audio, "sampling_rate": SAMPLE_RATE}, **SPEECH_CHUNKING)
+            speech_seconds.append(time.perf_counter() - started)
+        text = result.get("text", "").strip() if isinstance(result, dict) else str(result)
+        classified = reference.read_text(encoding="utf-8") if reference.is_file() else text
+        started = time.perf_counter()
+        rows = emotion(classified or " ", top_k=None, truncation=True)
+        emotion_seconds = time.perf_counter() - started
+        tracks.append(
+            {
+                "file": path.name,
+                "audioSeconds": round(audio.size / SAMPLE_RATE, 3),
+                "speechSeconds": min(speech_seconds),
+                "emotionSeconds": emotion_seconds,
+                "text": text,
+                "scores": {row["label"]: row["score"] for row in rows},
+            }
+        )
+    print(
+        json.dumps(
+            {
+                "loadSeconds": load_seconds,
+                "maxRssMb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                "tracks": tracks,
+            }
+        )
+    )
+
+
+def measure(backend: str, args: argparse.Namespace) -> Dict[str, Any]:
+    cmd = [sys.executable, __file__, args.audio_dir, "--worker", backend]
+    cmd += ["--cache-dir", args.cache_dir, "--repeats", str(args.repeats)]
+    cmd += ["--intra", str(args.intra), "--inter", str(args.inter)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def summarize(run: Dict[str, Any], baseline: Dict[str, Any], audio_dir: Path) -> Dict[str, Any]:
+    tracks = run["tracks"]
+    base = {track["file"]: track for track in baseline["tracks"]}
+    wer, agree, score_delta = [], [], []
+    for track in tracks:
+        reference = (audio_dir / track["file"]).with_suffix(".txt")
+        expected = base[track["file"]]
+        truth = reference.read_text(encoding="utf-8") if reference.is_file() else expected["text"]
+        wer.append(word_error_rate(truth, track["text"]))
+        scores, base_scores = track["scores"], expected["scores"]
+        if scores and base_scores:
+            agree.append(max(scores, key=scores.get) == max(base_scores, key=base_scores.get))
+            deltas = [abs(scores.get(label, 0.0) - v) for label, v in base_scores.items()]
+            score_delta.append(statistics.fmean(deltas))
+    speech = [track["speechSeconds"] for track in tracks]
+    audio_seconds = sum(track["audioSeconds"] for track in tracks)
+    return {
+        "loadSeconds": round(run["loadSeconds"], 2),
+        "maxRssMb": round(run["maxRssMb"], 1),
+        "speechMs": {
+            "mean": round(statistics.fmean(speech) * 1000, 1) if speech else 0.0,
+            "max": round(max(speech) * 1000, 1) if speech else 0.0,
+        },
+        "realTimeFactor": round(sum(speech) / audio_seconds, 4) if audio_seconds else None,
+        "emotionMs": round(statistics.fmean(t["emotionSeconds"] for t in tracks) * 1000, 2)
+        if tracks
+        else 0.0,
+        "wer": round(statistics.fmean(wer), 4) if wer else None,
+        "emotionTop1Agreement": round(sum(agree) / len(agree), 4) if agree else None,
+        "emotionScoreDelta": round(statistics.fmean(score_delta), 4) if score_delta else None,
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("audio_dir")
+    parser.add_argument("--backends", default="pytorch,quantized,onnx")
+    parser.add_argument("--baseline", default="pytorch")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--intra", type=int, default=0, help="intra-op threads, 0 for default")
+    parser.add_argument("--inter", type=int, default=0, help="inter-op threads, 0 for default")
+    parser.add_argument("--cache-dir", default=str(ROOT / "cache" / "models"))
+    parser.add_argument("--output")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        run_worker(args)
+        return
+
+    audio_dir = Path(args.audio_dir)
+    if not audio_files(audio_dir):
+        parser.error(f"no audio files in {audio_dir}")
+    backends = [name for name in args.backends.split(",") if name]
+    if args.baseline not in backends:
+        backends.insert(0, args.baseline)
+    runs = {name: measure(name, args) for name in backends}
+    report = {
+        "audioFiles": len(runs[args.baseline]["tracks"]),
+        "baseline": args.baseline,
+        "threads": {"intra": args.intra, "inter": args.inter},
+        "backends": {
+            name: summarize(run, runs[args.baseline], audio_dir) for name, run in runs.items()
+        },
+    }
+    base = report["backends"][args.baseline]
+    for summary in report["backends"].values():
+        if summary["speechMs"]["mean"]:
+            speedup = base["speechMs"]["mean"] / summary["speechMs"]["mean"]
+            summary["speechSpeedup"] = round(speedup, 2)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,86 @@
+"""Measure parallel chunked transcription speed-up against core count.
+
+    python benchmarks/bench_parallel_transcribe.py path/to/long-track.mp3 \
+        --cores 1 2 4 8 --output parallel.json
+
+For each core count torch is limited to that many threads and the track is
+transcribed once sequentially and once with transcribe_parallel at the same
+degree of parallelism. Set MODEL_WORKER_MODE=process to measure the process
+pool instead of batched pipeline calls.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import torch  # noqa: E402
+
+from app import main  # noqa: E402
+
+
+async def timed(coro) -> tuple[float, str]:
+    started = time.perf_counter()
+    text = await coro
+    return time.perf_counter() - started, text
+
+
+async def run(audio_path: Path, cores: List[int]) -> Dict[str, Any]:
+    audio = await main.decode_audio(audio_path)
+    duration = audio.size / main.SAMPLE_RATE
+    await main.transcribe_parallel(audio[: main.SAMPLE_RATE * 5], main.SAMPLE_RATE, 1)
+
+    rows = []
+    baseline = None
+    for count in cores:
+        torch.set_num_threads(count)
+        sequential, reference = await timed(
+            main.run_speech_pipeline(audio, main.SAMPLE_RATE, **main.SPEECH_CHUNKING)
+        )
+        parallel, text = await timed(main.transcribe_parallel(audio, main.SAMPLE_RATE, count))
+        if baseline is None:
+            baseline = sequential
+        rows.append(
+            {
+                "cores": count,
+                "sequentialSeconds": round(sequential, 3),
+                "parallelSeconds": round(parallel, 3),
+                "speedupVsSequential": round(sequential / parallel, 3),
+                "speedupVsOneCore": round(baseline / parallel, 3),
+                "realtimeFactor": round(duration / parallel, 2),
+                "referenceChars": len(main.transcription_text(reference)),
+                "parallelChars": len(text),
+            }
+        )
+    return {
+        "audio": str(audio_path),
+        "durationSeconds": round(duration, 2),
+        "mode": main.MODEL_WORKER_MODE,
+        "windowSeconds": main.TRANSCRIBE_WINDOW_S,
+        "overlapSeconds": main.TRANSCRIBE_OVERLAP_S,
+        "results": rows,
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("audio", type=Path)
+    default_cores = [n for n in (1, 2, 4, 8, 16, 32) if n <= (os.cpu_count() or 1)]
+    parser.add_argument("--cores", type=int, nargs="+", default=default_cores)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    report = asyncio.run(run(args.audio, args.cores))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,274 @@
+"""Offline benchmark of the analysis stages and HTTP endpoints.
+
+    python benchmarks/bench_pipeline.py --output after.json --compare before.json
+
+The model getters and the Elasticsearch client are replaced by the stand-ins
+in benchmarks/stubs.py, so nothing is downloaded and no cluster is needed;
+ffmpeg must be on PATH. Every synthetic track has unique content, so the
+analysis cache never short-circuits a measured request. The report is JSON
+and carries the git commit, so runs from two commits can be diffed with
+--compare.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+WORKDIR = Path(tempfile.mkdtemp(prefix="bench-pipeline-"))
+os.environ.setdefault("CACHE_DIR", str(WORKDIR / "cache"))
+os.environ.setdefault("JOBS_DIR", str(WORKDIR / "jobs"))
+os.environ.setdefault("READ_CACHE_TTL", "0")
+os.environ.setdefault("UPLOAD_DIR", str(WORKDIR / "uploads"))
+os.environ.setdefault("UPLOAD_REAPER_ENABLED", "0")
+sys.path.insert(0, str(ROOT))
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+from starlette.datastructures import UploadFile  # noqa: E402
+
+from app import main  # noqa: E402
+from stubs import (  # noqa: E402
+    FakeElasticsearch,
+    FakeEmotionPipeline,
+    FakeKeyBERT,
+    FakeSpeechPipeline,
+)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], elapsed: float | None = None) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {
+        "samples": len(latencies),
+        "latencyMs": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+        },
+    }
+    if elapsed is not None:
+        summary["throughputRps"] = round(len(latencies) / elapsed, 2) if elapsed else 0.0
+    return summary
+
+
+def synthetic_wav(seconds: float, seed: int, sample_rate: int = 44100) -> bytes:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    tone = 0.3 * np.sin(2 * np.pi * (180 + seed % 200) * t) * (1 + np.sin(2 * np.pi * 3 * t))
+    noise = 0.02 * rng.standard_normal(t.size)
+    pcm = (np.clip(tone + noise, -1, 1) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(2)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(np.repeat(pcm, 2).tobytes())
+    return buffer.getvalue()
+
+
+def install_stubs(args: argparse.Namespace) -> None:
+    speech = FakeSpeechPipeline(args.speech_latency)
+    emotion = FakeEmotionPipeline(args.emotion_latency)
+    keywords = FakeKeyBERT(args.keyword_latency)
+
+    async def get_speech_pipeline():
+        return speech
+
+    async def get_emotion_pipeline():
+        return emotion
+
+    async def get_keyword_model():
+        return keywords
+
+    main._speech_pipeline = speech
+    main._emotion_pipeline = emotion
+    main._keyword_model = keywords
+    main.get_speech_pipeline = get_speech_pipeline
+    main.get_emotion_pipeline = get_emotion_pipeline
+    main.get_keyword_model = get_keyword_model
+    main.es_client = FakeElasticsearch(args.es_latency, documents=args.documents)
+
+
+async def bench_stages(args: argparse.Namespace) -> Dict[str, Any]:
+    timings: Dict[str, List[float]] = {
+        "save_upload": [],
+        "extract_media_metadata": [],
+        "convert_to_wav": [],
+        "_load_audio_array": [],
+        "decode_audio": [],
+        "analyze_text": [],
+    }
+
+    async def timed(stage: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.perf_counter()
+        result = await call()
+        timings[stage].append(time.perf_counter() - started)
+        return result
+
+    for n in range(args.iterations):
+        data = synthetic_wav(args.audio_seconds, seed=n)
+        upload = UploadFile(io.BytesIO(data), filename=f"bench-{n}.wav")
+        stored, _ = await timed("save_upload", lambda: main.save_upload(upload))
+        await timed(
+            "extract_media_metadata",
+            lambda: asyncio.to_thread(main.extract_media_metadata, upload.filename, stored),
+        )
+        wav_path = await timed("convert_to_wav", lambda: main.convert_to_wav(stored))
+        try:
+            await timed(
+                "_load_audio_array", lambda: asyncio.to_thread(main._load_audio_array, wav_path)
+            )
+        finally:
+            wav_path.unlink(missing_ok=True)
+        await timed("decode_audio", lambda: main.decode_audio(stored, args.audio_seconds))
+        text = " ".join(f"bench{n} love night city dream" for _ in range(20))
+        await timed("analyze_text", lambda: main.analyze_text(text))
+    return {stage: summarize(values) for stage, values in timings.items()}
+
+
+async def closed_loop(
+    request: Callable[[int], Awaitable[httpx.Response]], concurrency: int, duration: float
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    counter = 0
+    deadline = time.perf_counter() + duration
+
+    async def client() -> None:
+        nonlocal errors, counter
+        while time.perf_counter() < deadline:
+            counter += 1
+            started = time.perf_counter()
+            resp = await request(counter)
+            if resp.status_code >= 400:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return {**summarize(latencies, time.perf_counter() - started), "errors": errors}
+
+
+async def bench_http(args: argparse.Namespace) -> Dict[str, Any]:
+    await main.on_startup()
+    track = synthetic_wav(args.audio_seconds, seed=10**6)
+    stored = main.UPLOAD_DIR / "bench-range.wav"
+    stored.write_bytes(track)
+    transport = httpx.ASGITransport(app=main.app)
+    results: Dict[str, Any] = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def analyze(n: int) -> httpx.Response:
+            data = synthetic_wav(args.audio_seconds, seed=args.iterations + n)
+            files = {"file": (f"load-{n}.wav", data, "audio/wav")}
+            return await client.post("/api/analyze", files=files)
+
+        async def search(n: int) -> httpx.Response:
+            return await client.get("/api/search", params={"q": "love city", "size": 25})
+
+        async def audio_range(n: int) -> httpx.Response:
+            start = (n * 65536) % max(1, len(track) - 65536)
+            headers = {"Range": f"bytes={start}-{start + 65535}"}
+            return await client.get(f"/api/audio/{stored.name}", headers=headers)
+
+        targets = {"analyze": analyze, "search": search, "audioRange": audio_range}
+        for name in args.target or list(targets):
+            concurrency = args.analyze_concurrency if name == "analyze" else args.concurrency
+            results[name] = {
+                "concurrency": concurrency,
+                **await closed_loop(targets[name], concurrency, args.duration),
+            }
+    await main.on_shutdown()
+    return results
+
+
+def git_commit() -> str | None:
+    proc = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+    )
+    return proc.stdout.strip() or None
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    deltas: Dict[str, Any] = {}
+    for section in ("stages", "http"):
+        for name, now in current.get(section, {}).items():
+            before = previous.get(section, {}).get(name)
+            if not before:
+                continue
+            row: Dict[str, float] = {}
+            if before["latencyMs"]["p50"]:
+                row["p50Ratio"] = round(now["latencyMs"]["p50"] / before["latencyMs"]["p50"], 3)
+            if before.get("throughputRps"):
+                row["throughputRatio"] = round(now["throughputRps"] / before["throughputRps"], 3)
+            deltas[f"{section}.{name}"] = row
+    return {"baseline": previous.get("meta", {}).get("commit"), "deltas": deltas}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    install_stubs(args)
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        }
+    }
+    if not args.skip_stages:
+        report["stages"] = await bench_stages(args)
+    if not args.skip_http:
+        report["http"] = await bench_http(args)
+    return report
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--audio-seconds", type=float, default=30.0)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--analyze-concurrency", type=int, default=4)
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--speech-latency", type=float, default=0.5, help="seconds per audio minute")
+    parser.add_argument("--emotion-latency", type=float, default=0.02)
+    parser.add_argument("--keyword-latency", type=float, default=0.02)
+    parser.add_argument("--es-latency", type=float, default=0.002)
+    parser.add_argument("--target", action="append", choices=["analyze", "search", "audioRange"])
+    parser.add_argument("--skip-stages", action="store_true")
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--output")
+    parser.add_argument("--compare", type=Path)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.compare:
+        report["comparison"] = compare(json.loads(args.compare.read_text()), report)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main_cli()
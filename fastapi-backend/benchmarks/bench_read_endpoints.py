@@ -0,0 +1,100 @@
+"""Closed-loop load test for the read endpoints of a running API.
+
+Run it against the server built from two commits to compare them, e.g.
+
+    python benchmarks/bench_read_endpoints.py --base-url http://localhost:3000 \
+        --concurrency 64 --duration 30 --output before.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict, List
+
+import aiohttp
+
+DEFAULT_TARGETS = {
+    "search": "/api/search?q=love&size=25",
+    "items": "/api/items?size=50",
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_target(
+    session: aiohttp.ClientSession, url: str, concurrency: int, duration: float
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                async with session.get(url) as resp:
+                    await resp.read()
+                    if resp.status >= 400:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughputRps": round(len(latencies) / elapsed, 2),
+        "latencyMs": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+        },
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:3000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--target", action="append", choices=sorted(DEFAULT_TARGETS))
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    report: Dict[str, Any] = {
+        "baseUrl": args.base_url,
+        "concurrency": args.concurrency,
+        "durationSeconds": args.duration,
+        "results": {},
+    }
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for name in args.target or sorted(DEFAULT_TARGETS):
+            url = args.base_url.rstrip("/") + DEFAULT_TARGETS[name]
+            report["results"][name] = await run_target(
+                session, url, args.concurrency, args.duration
+            )
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,143 @@
+"""Measure cold import time, time to first response and time to readiness.
+
+    python benchmarks/bench_startup.py --runs 3 --output startup.json
+    WARMUP_ENABLED=1 MODEL_LOAD_CONCURRENCY=3 python benchmarks/bench_startup.py
+
+Each run imports app.main in a fresh interpreter (reporting whether torch,
+transformers or keybert were pulled in), then starts uvicorn and polls
+/api/health and /api/ready until the server is live and its models are
+loaded. The server's environment is inherited, so model worker mode, load
+order, concurrency and warm-up can be compared run against run.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("torch", "transformers", "keybert", "sentence_transformers")
+IMPORT_PROBE = (
+    "import json, sys, time\n"
+    "started = time.perf_counter()\n"
+    "import app.main\n"
+    "elapsed = time.perf_counter() - started\n"
+    f"print(json.dumps({{'seconds': elapsed, 'heavy': [m for m in {HEAVY_MODULES!r} "
+    "if m in sys.modules]}))\n"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(url: str) -> tuple[int, Dict[str, Any] | None]:
+    try:
+        with urllib.request.urlopen(url, timeout=2) as resp:
+            return resp.status, json.loads(resp.read() or b"null")
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read() or b"null")
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return 0, None
+
+
+def measure_import() -> Dict[str, Any]:
+    proc = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure_server(timeout: float) -> Dict[str, Any]:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    live = ready = None
+    payload = None
+    try:
+        while time.perf_counter() - started < timeout:
+            if live is None and get(f"{base}/api/health")[0] == 200:
+                live = time.perf_counter() - started
+            if live is not None:
+                status, payload = get(f"{base}/api/ready")
+                if status == 200:
+                    ready = time.perf_counter() - started
+                    break
+            if server.poll() is not None:
+                break
+            time.sleep(0.1)
+    finally:
+        server.terminate()
+        try:
+            server.wait(10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return {
+        "liveSeconds": round(live, 3) if live is not None else None,
+        "readySeconds": round(ready, 3) if ready is not None else None,
+        "ready": payload,
+    }
+
+
+def summary(values: List[float | None]) -> Dict[str, Any]:
+    present = [v for v in values if v is not None]
+    if not present:
+        return {"runs": len(values), "failures": len(values)}
+    return {
+        "runs": len(values),
+        "failures": len(values) - len(present),
+        "min": round(min(present), 3),
+        "median": round(statistics.median(present), 3),
+        "max": round(max(present), 3),
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--skip-server", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    servers = [] if args.skip_server else [measure_server(args.timeout) for _ in range(args.runs)]
+    settings = (
+        "MODEL_WORKER_MODE",
+        "MODEL_LOAD_ORDER",
+        "MODEL_LOAD_CONCURRENCY",
+        "WARMUP_ENABLED",
+        "INFERENCE_BACKEND",
+    )
+    report = {
+        "env": {name: os.environ.get(name) for name in settings},
+        "importSeconds": summary([run["seconds"] for run in imports]),
+        "heavyModulesAtImport": sorted({m for run in imports for m in run["heavy"]}),
+        "liveSeconds": summary([run["liveSeconds"] for run in servers]),
+        "readySeconds": summary([run["readySeconds"] for run in servers]),
+        "runs": servers,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,205 @@
+"""Deterministic stand-ins for the models and Elasticsearch used by app.main."""
+
+import asyncio
+import hashlib
+import itertools
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import numpy as np
+
+from elasticsearch import NotFoundError
+
+EMOTIONS = ["anger", "disgust", "fear", "joy", "sadness", "surprise"]
+WORDS = "love night city dream fire rain heart road light dance".split()
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little")
+
+
+class FakeSpeechPipeline:
+    """Whisper stand-in: sleeps ``seconds_per_minute`` per minute of audio."""
+
+    def __init__(self, seconds_per_minute: float) -> None:
+        self.seconds_per_minute = seconds_per_minute
+
+    def _one(self, item: Dict[str, Any], return_timestamps: bool = False) -> Dict[str, Any]:
+        audio = item["array"]
+        duration = audio.size / item["sampling_rate"]
+        time.sleep(self.seconds_per_minute * duration / 60)
+        words = [WORDS[i % len(WORDS)] for i in range(max(1, int(duration * 2)))]
+        result: Dict[str, Any] = {"text": " ".join(words)}
+        if return_timestamps:
+            result["chunks"] = [{"timestamp": (0.0, duration), "text": result["text"]}]
+        return result
+
+    def __call__(self, inputs: Any, **kwargs: Any) -> Any:
+        return_timestamps = bool(kwargs.get("return_timestamps"))
+        if isinstance(inputs, list):
+            return [self._one(item, return_timestamps) for item in inputs]
+        return self._one(inputs, return_timestamps)
+
+
+class FakeEmotionPipeline:
+    def __init__(self, seconds_per_batch: float) -> None:
+        self.seconds_per_batch = seconds_per_batch
+        config = SimpleNamespace(id2label=dict(enumerate(EMOTIONS)))
+        self.model = SimpleNamespace(config=config)
+
+    def __call__(self, texts: Any, top_k: int = 8, **kwargs: Any) -> Any:
+        time.sleep(self.seconds_per_batch)
+        single = isinstance(texts, str)
+        rows = []
+        for text in [texts] if single else texts:
+            rng = np.random.default_rng(_seed(text))
+            scores = rng.dirichlet(np.ones(len(EMOTIONS)))
+            ranked = sorted(zip(EMOTIONS, scores), key=lambda pair: pair[1], reverse=True)
+            rows.append([{"label": label, "score": float(score)} for label, score in ranked[:top_k]])
+        return rows[0] if single else rows
+
+
+class FakeEmbedder:
+    def __init__(self, dims: int = 384) -> None:
+        self.dims = dims
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.stack(
+            [np.random.default_rng(_seed(text)).standard_normal(self.dims) for text in texts]
+        ).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class FakeKeyBERT:
+    def __init__(self, seconds_per_batch: float) -> None:
+        self.seconds_per_batch = seconds_per_batch
+        self.model = FakeEmbedder()
+
+    def extract_keywords(self, docs: Any, top_n: int = 5, **kwargs: Any) -> Any:
+        time.sleep(self.seconds_per_batch)
+        single = isinstance(docs, str) or len(docs) == 1
+        results = []
+        for doc in [docs] if isinstance(docs, str) else docs:
+            unique = list(dict.fromkeys(doc.split()))[:top_n]
+            results.append([(word, round(1 - i * 0.1, 2)) for i, word in enumerate(unique)])
+        return results[0] if single else results
+
+
+class _FakeIndices:
+    def __init__(self, client: "FakeElasticsearch") -> None:
+        self.client = client
+
+    async def exists(self, index: str) -> bool:
+        await self.client._delay()
+        return True
+
+    async def create(self, index: str, **kwargs: Any) -> Dict[str, Any]:
+        await self.client._delay()
+        return {"acknowledged": True}
+
+
+class FakeElasticsearch:
+    """In-memory subset of AsyncElasticsearch with a fixed per-call latency."""
+
+    def __init__(self, latency: float, documents: int = 500) -> None:
+        self.latency = latency
+        self.indices = _FakeIndices(self)
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count()
+        for n in range(documents):
+            words = [WORDS[(n + i) % len(WORDS)] for i in range(8)]
+            self.docs[str(next(self._ids))] = {
+                "transcription": " ".join(words),
+                "keywords": words[:3],
+                "primaryEmotions": [EMOTIONS[n % len(EMOTIONS)].title()],
+                "confidence": 50 + n % 50,
+                "timestamp": f"2024-01-01T00:{n // 60 % 60:02d}:{n % 60:02d}",
+            }
+
+    async def _delay(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def info(self) -> Dict[str, Any]:
+        await self._delay()
+        return {"cluster_name": "fake"}
+
+    async def ping(self) -> bool:
+        await self._delay()
+        return True
+
+    def _matches(self, query: Dict[str, Any] | None) -> List[tuple[str, Dict[str, Any]]]:
+        text = ((query or {}).get("multi_match") or {}).get("query")
+        items = list(self.docs.items())
+        if not text:
+            return items
+        terms = text.lower().split()
+        return [(i, d) for i, d in items if any(t in d["transcription"] for t in terms)]
+
+    async def search(self, **kwargs: Any) -> Dict[str, Any]:
+        await self._delay()
+        size = kwargs.get("size", 10)
+        offset = kwargs.get("from_", 0)
+        matches = self._matches(kwargs.get("query"))
+        if kwargs.get("search_after"):
+            offset = int(kwargs["search_after"][-1]) + 1
+        page = matches[offset : offset + size]
+        hits = [
+            {"_id": doc_id, "_score": 1.0, "_source": doc, "sort": [0, offset + n]}
+            for n, (doc_id, doc) in enumerate(page)
+        ]
+        resp: Dict[str, Any] = {"hits": {"total": {"value": len(matches)}, "hits": hits}}
+        if "pit" in kwargs:
+            resp["pit_id"] = kwargs["pit"]["id"]
+        if "aggs" in kwargs:
+            resp["aggregations"] = {
+                "emotions_count": {"buckets": [{"key": "Joy", "doc_count": len(matches)}]},
+                "avg_confidence": {"value": 72.5},
+            }
+        return resp
+
+    async def get(self, index: str, id: str) -> Dict[str, Any]:
+        await self._delay()
+        if id not in self.docs:
+            raise NotFoundError(404, "not_found", {})
+        return {"_id": id, "_source": self.docs[id]}
+
+    async def index(self, index: str, document: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        await self._delay()
+        doc_id = str(next(self._ids))
+        self.docs[doc_id] = document
+        return {"_id": doc_id, "result": "created"}
+
+    async def update(self, index: str, id: str, doc: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        await self._delay()
+        if id not in self.docs:
+            raise NotFoundError(404, "not_found", {})
+        self.docs[id].update(doc)
+        return {"_id": id, "result": "updated"}
+
+    async def delete(self, index: str, id: str) -> Dict[str, Any]:
+        await self._delay()
+        if self.docs.pop(id, None) is None:
+            raise NotFoundError(404, "not_found", {})
+        return {"_id": id, "result": "deleted"}
+
+    async def bulk(self, operations: List[Dict[str, Any]], **kwargs: Any) -> Dict[str, Any]:
+        await self._delay()
+        items = []
+        for meta, doc in zip(operations[::2], operations[1::2]):
+            doc_id = meta["index"].get("_id") or str(next(self._ids))
+            self.docs[doc_id] = doc
+            items.append({"index": {"_id": doc_id, "status": 201}})
+        return {"errors": False, "items": items}
+
+    async def open_point_in_time(self, index: str, keep_alive: str) -> Dict[str, Any]:
+        await self._delay()
+        return {"id": "fake-pit"}
+
+    async def close_point_in_time(self, id: str) -> Dict[str, Any]:
+        await self._delay()
+        return {"succeeded": True}
+
+    async def close(self) -> None:
+        return None